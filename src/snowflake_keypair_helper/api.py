@@ -1,10 +1,21 @@
 from snowflake_keypair_helper.jwt_generator import (
     JWTGenerator,
+    JWTGeneratorRegistry,
+    JWTVerifier,
+)
+from snowflake_keypair_helper.keypair_pool import (
+    KeypairPool,
+)
+from snowflake_keypair_helper.keystore import (
+    KeyStore,
+    KeyStoreFile,
+    write_keystore_path,
 )
 from snowflake_keypair_helper.snowflake_keypair import (
     SnowflakeKeypair,
 )
 from snowflake_keypair_helper.utils.con_utils import (
+    ConnectionPool,
     assign_public_key,
     con_to_adbc_con,
     connect_env,
@@ -19,14 +30,27 @@ from snowflake_keypair_helper.utils.crypto_utils import (
     encrypt_private_bytes_snowflake_adbc,
     generate_private_str,
 )
+from snowflake_keypair_helper.utils.ingest_utils import (
+    IngestWriter,
+    parallel_ingest,
+)
 
 
 __all__ = [
     # jwt_generator
     "JWTGenerator",
+    "JWTGeneratorRegistry",
+    "JWTVerifier",
+    # keypair_pool
+    "KeypairPool",
+    # keystore
+    "KeyStore",
+    "KeyStoreFile",
+    "write_keystore_path",
     # snowflake_keypair
     "SnowflakeKeypair",
     # utils.con_utils
+    "ConnectionPool",
     "assign_public_key",
     "con_to_adbc_con",
     "connect_env",
@@ -40,4 +64,7 @@ __all__ = [
     "decrypt_private_bytes_snowflake",
     "encrypt_private_bytes_snowflake_adbc",
     "generate_private_str",
+    # utils.ingest_utils
+    "IngestWriter",
+    "parallel_ingest",
 ]
@@ -15,6 +15,7 @@ from snowflake_keypair_helper.utils.con_utils import (
 )
 from snowflake_keypair_helper.utils.con_utils import (
     connect_env,
+    connect_many,
     make_env_name,
 )
 from snowflake_keypair_helper.utils.env_utils import (
@@ -79,12 +80,54 @@ def skh_generate_keypair(
 @click.option("--env-path", default=devnull)
 @click.option("--prefix", default=None)
 @click.option("--connection-name", default=None)
-def skh_validate_credentials(env_path=devnull, prefix=None, connection_name=None):
+@click.option(
+    "--all-connections",
+    is_flag=True,
+    default=False,
+    help="validate every SNOWFLAKE_CONNECTIONS_<name>_ profile concurrently",
+)
+@click.option("--max-workers", default=8, type=click.IntRange(min=1))
+def skh_validate_credentials(
+    env_path=devnull,
+    prefix=None,
+    connection_name=None,
+    all_connections=False,
+    max_workers=8,
+):
+    if all_connections:
+        if prefix is not None or connection_name is not None:
+            raise click.UsageError(
+                "--all-connections cannot be combined with --prefix or --connection-name"
+            )
+        return validate_all_connections(env_path=env_path, max_workers=max_workers)
     con = connect_env(env_path=env_path, prefix=prefix, connection_name=connection_name)
     dct = {name: getattr(con, name) for name in ("account", "user", "role")}
     print(f"snowflake-keypair-helper: successfully validated credentials for {dct}")
 
 
+def validate_all_connections(env_path=devnull, max_workers=8):
+    results = connect_many(env_path=env_path, max_workers=max_workers)
+    if not results:
+        raise click.ClickException("no connection profiles found")
+    for result in results:
+        if result["success"]:
+            dct = {
+                name: getattr(result["con"], name)
+                for name in ("account", "user", "role")
+            }
+            message = f"successfully validated credentials for {dct}"
+        else:
+            message = f"failed: {result['error']!r}"
+        print(
+            f"snowflake-keypair-helper: {result['connection_name']} ({result['seconds']:.3f}s): {message}"
+        )
+    if failed := tuple(result for result in results if not result["success"]):
+        raise click.ClickException(
+            f"{len(failed)} of {len(results)} connections failed: {', '.join(result['connection_name'] for result in failed)}"
+        )
+    return results
+
+
 @click.command(help="assign a public key to a user")
 @click.argument("user")
 @click.option("--public-key-str", default=None)
@@ -1,15 +1,21 @@
 import base64
 import hashlib
+import json
+import os
+import random
+import threading
+import weakref
+from calendar import timegm
 from datetime import (
     datetime,
     timedelta,
     timezone,
 )
 from functools import partial
+from pathlib import Path
 
 import attr.setters as setters
 import cryptography.hazmat.primitives.asymmetric.rsa as rsa
-import jwt
 import requests
 from attr import (
     define,
@@ -17,16 +23,37 @@ from attr import (
     field,
 )
 from attr.validators import (
+    ge,
     instance_of,
     optional,
 )
+from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.hashes import SHA256
 from cryptography.hazmat.primitives.serialization import (
     Encoding,
+    NoEncryption,
+    PrivateFormat,
     PublicFormat,
     load_der_private_key,
     load_pem_private_key,
 )
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidAlgorithmError,
+    InvalidIssuerError,
+    InvalidSignatureError,
+    InvalidTokenError,
+    MissingRequiredClaimError,
+)
+
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+    make_digest,
+)
 
 
 try:
@@ -46,6 +73,134 @@ def prepare_account_name_for_jwt(account: Text) -> Text:
     return account.upper().split(split_on)[0]
 
 
+# digest of (format, key bytes, passphrase) or (path, mtime, size, passphrase) -> RSAPrivateKey
+parsed_private_key_cache = TTLLRUCache(maxsize=128, ttl=15 * 60)
+
+
+def load_private_key_cached(
+    private_bytes: bytes, passphrase=None, cache=parsed_private_key_cache
+):
+    # DER is always unencrypted here: snowflake.connector decrypts before connecting
+    is_der = not private_bytes.lstrip().startswith(b"-----")
+
+    def load():
+        if is_der:
+            return load_der_private_key(private_bytes, None)
+        return load_pem_private_key(
+            private_bytes,
+            passphrase.encode() if passphrase else None,
+            default_backend(),
+        )
+
+    key = make_digest("der" if is_der else "pem", private_bytes, passphrase or None)
+    return cache.get_or_set(key, load)
+
+
+def load_private_key_path_cached(path, passphrase=None, cache=parsed_private_key_cache):
+    # a changed file has a new mtime or size: stale entries just age out
+    stat = (path := Path(path).absolute()).stat()
+    key = make_digest(
+        "path", str(path), str(stat.st_mtime_ns), str(stat.st_size), passphrase or None
+    )
+    return cache.get_or_set(
+        key,
+        lambda: load_private_key_cached(path.read_bytes(), passphrase, cache=cache),
+    )
+
+
+def base64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def make_json_segment(obj, **kwargs) -> bytes:
+    # the same compact encoding as jwt.encode
+    return base64url_encode(json.dumps(obj, separators=(",", ":"), **kwargs).encode())
+
+
+@define(frozen=True)
+class RS256Signer:
+    """
+    Signs Snowflake's fixed four claim payload without going through jwt.encode. The header segment is encoded once and
+    the payload is formatted from a template in which only iat and exp vary. Tokens are byte-identical to
+    jwt.encode(payload, private_key, algorithm="RS256") since PKCS1v15 signatures are deterministic.
+    """
+
+    # jwt.encode sorts the header keys
+    header_segment = make_json_segment({"alg": "RS256", "typ": "JWT"}, sort_keys=True)
+
+    private_key: rsa.RSAPrivateKey = field(
+        validator=instance_of(rsa.RSAPrivateKey), repr=False
+    )
+    issuer: Text = field(validator=instance_of(Text))
+    subject: Text = field(validator=instance_of(Text))
+    # '{"iss":...,"sub":...,"iat":%d,"exp":%d}', with iss and sub already json encoded
+    _payload_template: Text = field(init=False, repr=False, eq=False)
+
+    @_payload_template.default
+    def _payload_template_default(self):
+        (iss, sub) = (
+            json.dumps(value).replace("%", "%%")
+            for value in (self.issuer, self.subject)
+        )
+        return f'{{"iss":{iss},"sub":{sub},"iat":%d,"exp":%d}}'
+
+    def sign(self, iat: datetime, exp: datetime) -> Text:
+        payload = self._payload_template % (
+            timegm(iat.utctimetuple()),
+            timegm(exp.utctimetuple()),
+        )
+        signing_input = (
+            self.header_segment + b"." + base64url_encode(payload.encode("utf-8"))
+        )
+        signature = self.private_key.sign(signing_input, PKCS1v15(), SHA256())
+        return (signing_input + b"." + base64url_encode(signature)).decode("ascii")
+
+
+# every live generator, by id: refresher threads and pooled connections don't survive a fork
+live_generators = weakref.WeakValueDictionary()
+
+
+def _reset_generators_after_fork():
+    for generator in tuple(live_generators.values()):
+        generator._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_generators_after_fork)
+
+
+# index -> (private key, fingerprint), loaded once per mint_many worker process
+_worker_private_keys = {}
+# (account, user, key index) -> RS256Signer: a token costs one signature, not a JWTGenerator
+_worker_signers = {}
+
+
+def _init_mint_worker(private_bytes_ders):
+    _worker_private_keys.clear()
+    _worker_signers.clear()
+    for i, der in enumerate(private_bytes_ders):
+        private_key = load_der_private_key(der, None)
+        _worker_private_keys[i] = (
+            private_key,
+            JWTGenerator.calculate_public_key_fingerprint(private_key),
+        )
+
+
+def _mint_token(spec, now, lifetime):
+    if (signer := _worker_signers.get(spec)) is None:
+        (account, user, key_index) = spec
+        (private_key, fingerprint) = _worker_private_keys[key_index]
+        # as JWTGenerator derives qualified_username and issuer
+        subject = prepare_account_name_for_jwt(account) + "." + user.upper()
+        signer = _worker_signers[spec] = RS256Signer(
+            private_key=private_key,
+            issuer=subject + "." + fingerprint,
+            subject=subject,
+        )
+    expire_time = now + lifetime
+    return (signer.sign(now, expire_time), expire_time)
+
+
 @define(on_setattr=setters.frozen)
 class JWTGenerator:
     """
@@ -66,7 +221,7 @@ class JWTGenerator:
     renewal_delay: timedelta = field(
         validator=instance_of(timedelta), default=RENEWAL_DELTA
     )
-    # only renew_time and token can be mutated
+    # only renew_time, expire_time and token can be mutated
     renew_time = field(
         validator=optional(instance_of(datetime)),
         factory=partial(datetime.now, timezone.utc),
@@ -75,6 +230,11 @@ class JWTGenerator:
     token = field(
         validator=optional(instance_of(Text)), default=None, on_setattr=setters.NO_OP
     )
+    expire_time = field(
+        validator=optional(instance_of(datetime)),
+        default=None,
+        on_setattr=setters.NO_OP,
+    )
     auth_url = field(
         validator=optional(instance_of(Text)), default=None, on_setattr=setters.NO_OP
     )
@@ -84,71 +244,295 @@ class JWTGenerator:
     role = field(
         validator=optional(instance_of(Text)), default=None, on_setattr=setters.NO_OP
     )
+    # how long an exchanged OAuth token is reused: defaults to renewal_delay
+    exchange_ttl = field(validator=optional(instance_of(timedelta)), default=None)
+    # derived once from account, user and private_key: a token mint only signs
+    qualified_username: Text = field(init=False)
+    # only passed by callers that already hold private_key's fingerprint
+    public_key_fp: Text = field(kw_only=True, validator=instance_of(Text))
+    issuer: Text = field(init=False)
+    _signer: RS256Signer = field(init=False, repr=False, eq=False)
+    # serializes renewal: only one thread signs a new token at a time
+    _lock: threading.Lock = field(
+        factory=threading.Lock,
+        init=False,
+        repr=False,
+        eq=False,
+        on_setattr=setters.NO_OP,
+    )
+    # keep-alive connection pool for OAuth exchanges, created on first use
+    _session: requests.Session = field(
+        default=None,
+        init=False,
+        repr=False,
+        eq=False,
+        on_setattr=setters.NO_OP,
+    )
+    # (auth_url, ingress_url, role) -> exchanged OAuth token
+    _exchanged_tokens: TTLLRUCache = field(
+        init=False, repr=False, eq=False, on_setattr=setters.NO_OP
+    )
+    # created lazily inside the running event loop: httpx is optional
+    _async_client = field(
+        default=None,
+        init=False,
+        repr=False,
+        eq=False,
+        on_setattr=setters.NO_OP,
+    )
+    # (auth_url, ingress_url, role) -> in-flight asyncio.Task of an exchange
+    _async_exchanges: dict = field(factory=dict, init=False, repr=False, eq=False)
+    # (thread, stop event, lead, jitter) while a background refresher runs
+    _refresher: tuple = field(
+        default=None,
+        init=False,
+        repr=False,
+        eq=False,
+        on_setattr=setters.NO_OP,
+    )
 
-    def __attrs_post_init__(self):
-        if self.renewal_delay > self.lifetime:
-            raise ValueError(
-                "renewal_delay must be less than or equal to lifetime but {self.renewal_delay} > {self.lifetime}"
-            )
+    @_exchanged_tokens.default
+    def _exchanged_tokens_default(self):
+        ttl = self.exchange_ttl or self.renewal_delay
+        return TTLLRUCache(maxsize=32, ttl=ttl.total_seconds())
 
-    @property
-    def qualified_username(self):
+    @qualified_username.default
+    def _qualified_username_default(self):
         return self.account + "." + self.user
 
-    @property
-    def public_key_fp(self):
+    @public_key_fp.default
+    def _public_key_fp_default(self):
         # Generate the public key fingerprint for the issuer in the payload.
         return self.calculate_public_key_fingerprint(self.private_key)
 
-    def generate_token(self, now) -> Text:
-        # Create our payload
-        payload = {
-            # Set the issuer to the fully qualified username concatenated with the public key fingerprint.
-            "iss": self.qualified_username + "." + self.public_key_fp,
-            # Set the subject to the fully qualified username.
-            "sub": self.qualified_username,
-            # Set the issue time to now.
-            "iat": now,
-            # Set the expiration time, based on the lifetime specified for this object.
-            "exp": now + self.lifetime,
-        }
-        # Regenerate the actual token
-        token = jwt.encode(
-            payload, key=self.private_key, algorithm=JWTGenerator.ALGORITHM
+    @issuer.default
+    def _issuer_default(self):
+        # Set the issuer to the fully qualified username concatenated with the public key fingerprint.
+        return self.qualified_username + "." + self.public_key_fp
+
+    @_signer.default
+    def _signer_default(self):
+        return RS256Signer(
+            private_key=self.private_key,
+            issuer=self.issuer,
+            subject=self.qualified_username,
         )
-        # If you are using a version of PyJWT prior to 2.0, jwt.encode returns a byte string instead of a string.
-        # If the token is a byte string, convert it to a string.
-        if isinstance(token, bytes):
-            token = token.decode("utf-8")
 
-        self.renew_time = now + self.renewal_delay
+    def __attrs_post_init__(self):
+        if self.renewal_delay > self.lifetime:
+            raise ValueError(
+                "renewal_delay must be less than or equal to lifetime but {self.renewal_delay} > {self.lifetime}"
+            )
+        live_generators[id(self)] = self
+
+    def generate_token(self, now) -> Text:
+        # the payload is {"iss": issuer, "sub": qualified_username, "iat": now, "exp": now + lifetime}
+        token = self._signer.sign(now, now + self.lifetime)
+
+        # readers check renew_time last: publish it after the token it guards
         self.token = token
+        self.expire_time = now + self.lifetime
+        self.renew_time = now + self.renewal_delay
+
+    def needs_renewal(self, now) -> bool:
+        return self.token is None or self.renew_time <= now
+
+    def is_token_valid(self, now) -> bool:
+        return (
+            self.token is not None
+            and self.expire_time is not None
+            and now < self.expire_time
+        )
 
     def get_token(self) -> Text:
         """
         Generates a new JWT. If a JWT has already been generated earlier, return the previously generated token unless the
-        specified renewal time has passed.
+        specified renewal time has passed. When several threads need a renewal at once, exactly one signs: the others
+        get the previous token while it is still valid or else wait for the new one.
         :return: the new token
         """
         now = datetime.now(timezone.utc)
-        if self.token is None or self.renew_time <= now:
-            # If the token has expired or doesn't exist, generate a new token.
-            self.generate_token(now)
-        return self.token
+        if not self.needs_renewal(now):
+            return self.token
+        if self.is_token_valid(now):
+            if not self._lock.acquire(blocking=False):
+                # another thread is already renewing
+                return self.token
+        else:
+            self._lock.acquire()
+        try:
+            # the renewal may have happened while we waited for the lock
+            if self.needs_renewal(now):
+                # If the token has expired or doesn't exist, generate a new token.
+                self.generate_token(now)
+            return self.token
+        finally:
+            self._lock.release()
 
-    def get_jwt(self, auth_url, ingress_url, role=None) -> Text:
-        data = {
+    def refresh_token(self) -> Text:
+        """
+        Sign a new token now, regardless of renew_time.
+        :return: the new token
+        """
+        with self._lock:
+            self.generate_token(datetime.now(timezone.utc))
+            return self.token
+
+    @property
+    def is_refreshing(self) -> bool:
+        return self._refresher is not None and self._refresher[0].is_alive()
+
+    def _refresh_until(self, stop, lead, jitter):
+        if self.token is None:
+            self.refresh_token()
+        while True:
+            # never wake before half of renewal_delay has passed since the last signing
+            ahead = min(lead + jitter * random.random(), self.renewal_delay / 2)
+            wake_time = self.renew_time - ahead
+            timeout = (wake_time - datetime.now(timezone.utc)).total_seconds()
+            if stop.wait(max(timeout, 0)):
+                return
+            self.refresh_token()
+
+    def start_refresher(
+        self, lead=timedelta(seconds=30), jitter=timedelta(seconds=10)
+    ) -> "JWTGenerator":
+        """
+        Re-sign the token on a daemon thread, lead (plus up to jitter) before renew_time, so that get_token always
+        returns from memory. The refresher doesn't survive a fork: a child that wants one calls start_refresher again.
+        """
+        if self.renewal_delay <= timedelta(0):
+            raise ValueError("renewal_delay must be positive to run a refresher")
+        if not self.is_refreshing:
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=self._refresh_until,
+                args=(stop, lead, jitter),
+                name=f"{type(self).__name__}-refresher-{self.qualified_username}",
+                daemon=True,
+            )
+            self._refresher = (thread, stop, lead, jitter)
+            thread.start()
+        return self
+
+    def stop_refresher(self, timeout=None):
+        if self._refresher is not None:
+            (thread, stop, *_) = self._refresher
+            stop.set()
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+            self._refresher = None
+
+    def _after_fork_in_child(self):
+        # runs in every forked child, pool workers included: only reset locks and drop references
+        # the parent's threads may have held these locks, or had exchanges in flight, when we forked
+        self._lock = threading.Lock()
+        self._exchanged_tokens = self._exchanged_tokens_default()
+        # the pooled sockets are the parent's: the next exchange makes a new session
+        self._session = None
+        # bound to the parent's event loop
+        self._async_client = None
+        self._async_exchanges.clear()
+        # the thread is gone
+        self._refresher = None
+
+    def _get_session(self):
+        if (session := self._session) is None:
+            session = self._session = requests.Session()
+        return session
+
+    @staticmethod
+    def make_exchange_data(ingress_url, role, token) -> dict:
+        return {
             "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
             "scope": ingress_url
             if role is None
             else f"session:role:{role} {ingress_url}",
-            "assertion": self.get_token(),
+            "assertion": token,
         }
-        response = requests.post(auth_url, data=data)
+
+    def exchange_jwt(self, auth_url, ingress_url, role=None) -> Text:
+        data = self.make_exchange_data(ingress_url, role, self.get_token())
+        response = self._get_session().post(auth_url, data=data)
         response.raise_for_status()
         assert 200 == response.status_code, "unable to get snowflake token"
         return response.text
 
+    def get_jwt(self, auth_url, ingress_url, role=None) -> Text:
+        # exchanged tokens are reused for exchange_ttl
+        return self._exchanged_tokens.get_or_set(
+            (auth_url, ingress_url, role),
+            partial(self.exchange_jwt, auth_url, ingress_url, role=role),
+        )
+
+    def close(self):
+        self.stop_refresher()
+        if (session := self._session) is not None:
+            self._session = None
+            session.close()
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            import httpx
+
+            self._async_client = httpx.AsyncClient()
+        return self._async_client
+
+    async def aget_token(self) -> Text:
+        if not self.needs_renewal(datetime.now(timezone.utc)):
+            return self.token
+        import asyncio
+
+        # don't block the event loop on the RSA signature
+        return await asyncio.to_thread(self.get_token)
+
+    async def aexchange_jwt(self, auth_url, ingress_url, role=None) -> Text:
+        data = self.make_exchange_data(ingress_url, role, await self.aget_token())
+        response = await self._get_async_client().post(auth_url, data=data)
+        response.raise_for_status()
+        return response.text
+
+    async def _aexchange_jwt_cached(self, key) -> Text:
+        try:
+            (auth_url, ingress_url, role) = key
+            jwt = await self.aexchange_jwt(auth_url, ingress_url, role=role)
+            return self._exchanged_tokens.set(key, jwt)
+        finally:
+            self._async_exchanges.pop(key, None)
+
+    async def aget_jwt(self, auth_url, ingress_url, role=None) -> Text:
+        """
+        Async counterpart of get_jwt: concurrent calls for the same scope share a single exchange. A generator's async
+        methods must all be used from the same event loop.
+        """
+        import asyncio
+
+        key = (auth_url, ingress_url, role)
+        if (jwt := self._exchanged_tokens.get(key)) is not None:
+            return jwt
+        if (task := self._async_exchanges.get(key)) is None:
+            task = self._async_exchanges[key] = asyncio.ensure_future(
+                self._aexchange_jwt_cached(key)
+            )
+        # a cancelled waiter must not cancel the exchange for everyone else
+        return await asyncio.shield(task)
+
+    async def aget_auth_headers(
+        self, auth_url=None, ingress_url=None, role=None
+    ) -> dict:
+        jwt = await self.aget_jwt(
+            auth_url or self.auth_url,
+            ingress_url or self.ingress_url,
+            role=role or self.role,
+        )
+        headers = {"Authorization": f'Snowflake Token="{jwt}"'}
+        return headers
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
     def get_auth_headers(self, auth_url=None, ingress_url=None, role=None) -> dict:
         jwt = self.get_jwt(
             auth_url or self.auth_url,
@@ -158,21 +542,23 @@ class JWTGenerator:
         headers = {"Authorization": f'Snowflake Token="{jwt}"'}
         return headers
 
-    evolve = evolve
+    def evolve(self, **changes) -> "JWTGenerator":
+        if "private_key" in changes and "public_key_fp" not in changes:
+            # the fingerprint of the old key would otherwise be carried over
+            changes["public_key_fp"] = self.calculate_public_key_fingerprint(
+                changes["private_key"]
+            )
+        return evolve(self, **changes)
 
     @classmethod
     def from_text(cls, text, passphrase=None, **kwargs):
-        private_key = load_pem_private_key(
-            text.encode(),
-            passphrase.encode() if passphrase else None,
-            default_backend(),
-        )
+        private_key = load_private_key_cached(text.encode(), passphrase)
         return cls(private_key=private_key, **kwargs)
 
     @classmethod
-    def from_path(cls, path, **kwargs):
-        text = path.read_text()
-        return cls.from_text(text, **kwargs)
+    def from_path(cls, path, passphrase=None, **kwargs):
+        private_key = load_private_key_path_cached(path, passphrase)
+        return cls(private_key=private_key, **kwargs)
 
     @classmethod
     def from_con(cls, con, **kwargs):
@@ -193,10 +579,10 @@ class JWTGenerator:
         if con._private_key:
             match con._private_key:
                 case bytes():
-                    private_key = load_der_private_key(con._private_key, None)
+                    private_key = load_private_key_cached(con._private_key)
                 case str():
-                    private_key = load_pem_private_key(
-                        wrap_pem_private_key(con._private_key).encode(), None
+                    private_key = load_private_key_cached(
+                        wrap_pem_private_key(con._private_key).encode()
                     )
                 case _:
                     raise ValueError
@@ -210,6 +596,42 @@ class JWTGenerator:
         else:
             raise ValueError
 
+    @classmethod
+    def mint_many(cls, specs, workers=None, chunksize=64, now=None, lifetime=LIFETIME):
+        """
+        Sign one token per (account, user, private_key) spec over a process pool. Each distinct key is serialized to DER
+        and shipped to every worker once, when the worker starts: tasks only carry (account, user, key index).
+        :param specs: iterable of (account, user, private_key), private_key an RSAPrivateKey or a SnowflakeKeypair
+        :return: tuple of (token, expire_time), in the order of specs
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        (der_to_index, task_specs) = ({}, [])
+        for account, user, private_key in specs:
+            der = getattr(private_key, "private_key", private_key).private_bytes(
+                encoding=Encoding.DER,
+                format=PrivateFormat.PKCS8,
+                encryption_algorithm=NoEncryption(),
+            )
+            key_index = der_to_index.setdefault(der, len(der_to_index))
+            task_specs.append((account, user, key_index))
+        if not task_specs:
+            return ()
+        # every token in the batch shares iat, so all expire together
+        now = now or datetime.now(timezone.utc)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_mint_worker,
+            initargs=(tuple(der_to_index),),
+        ) as executor:
+            return tuple(
+                executor.map(
+                    partial(_mint_token, now=now, lifetime=lifetime),
+                    task_specs,
+                    chunksize=chunksize,
+                )
+            )
+
     @staticmethod
     def calculate_public_key_fingerprint(private_key: rsa.RSAPrivateKey) -> Text:
         """
@@ -217,11 +639,20 @@ class JWTGenerator:
         :param private_key: private key string
         :return: public key fingerprint
         """
+        return JWTGenerator.calculate_public_key_fingerprint_public(
+            private_key.public_key()
+        )
+
+    @staticmethod
+    def calculate_public_key_fingerprint_public(public_key: rsa.RSAPublicKey) -> Text:
+        """
+        Given a public key, return its fingerprint as it appears in a JWT's issuer.
+        :param public_key: public key
+        :return: public key fingerprint
+        """
         # Get the sha256 hash of the raw bytes.
         sha256hash = hashlib.sha256(
-            private_key.public_key().public_bytes(
-                Encoding.DER, PublicFormat.SubjectPublicKeyInfo
-            )
+            public_key.public_bytes(Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
         )
 
         # Base64-encode the value and prepend the prefix "SHA256:".
@@ -229,3 +660,194 @@ class JWTGenerator:
             "utf-8"
         )
         return public_key_fp
+
+
+@define
+class JWTGeneratorRegistry:
+    """
+    Shares one JWTGenerator per (account, user, public key fingerprint) so that cached tokens survive across requests
+    in a multi-tenant service. At most maxsize generators are kept: the least recently used one is evicted (and
+    closed) first, as is any generator left unused for idle_timeout.
+    """
+
+    maxsize: int = field(default=256, validator=[instance_of(int), ge(1)])
+    idle_timeout: timedelta = field(
+        default=timedelta(hours=1), validator=optional(instance_of(timedelta))
+    )
+    # passed to every JWTGenerator this registry creates
+    generator_kwargs: dict = field(factory=dict, validator=instance_of(dict))
+    # its get_or_set builds a generator outside the lock, once per key at a time
+    _generators: TTLLRUCache = field(init=False, repr=False)
+
+    @_generators.default
+    def _generators_default(self):
+        return TTLLRUCache(
+            maxsize=self.maxsize,
+            ttl=None
+            if self.idle_timeout is None
+            else self.idle_timeout.total_seconds(),
+            touch=True,
+            on_evict=lambda _, generator: generator.close(),
+        )
+
+    def __len__(self):
+        return len(self._generators)
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._generators),
+            "hits": self._generators.hits,
+            "misses": self._generators.misses,
+            "evictions": self._generators.evictions,
+        }
+
+    @staticmethod
+    def make_key(account, user, private_key) -> tuple:
+        match private_key:
+            case rsa.RSAPrivateKey():
+                fingerprint = JWTGenerator.calculate_public_key_fingerprint(private_key)
+            case _:
+                # SnowflakeKeypair memoizes its fingerprint
+                fingerprint = private_key.public_key_fingerprint
+        return (prepare_account_name_for_jwt(account), user.upper(), fingerprint)
+
+    def get(self, account, user, private_key, **kwargs) -> JWTGenerator:
+        """
+        Return the shared generator for (account, user, private_key), creating it on first use. kwargs only apply on
+        creation.
+        :param private_key: an RSAPrivateKey or a SnowflakeKeypair
+        """
+
+        key = self.make_key(account, user, private_key)
+
+        def make_generator():
+            return JWTGenerator(
+                account=account,
+                user=user,
+                private_key=getattr(private_key, "private_key", private_key),
+                public_key_fp=key[-1],
+                **self.generator_kwargs | kwargs,
+            )
+
+        self._generators.evict_expired()
+        return self._generators.get_or_set(key, make_generator)
+
+    def close(self):
+        self._generators.clear()
+
+
+def base64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+@define
+class JWTVerifier:
+    """
+    Verifies tokens minted by JWTGenerator locally, without calling Snowflake. Public keys are indexed by fingerprint,
+    so the key for a token is a single dict lookup on the fingerprint at the end of its issuer. Failures raise the
+    same exception types as jwt.decode.
+    """
+
+    leeway: timedelta = field(default=timedelta(0), validator=instance_of(timedelta))
+    _public_keys: dict = field(factory=dict, init=False, repr=False)
+
+    def __len__(self):
+        return len(self._public_keys)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._public_keys
+
+    def add(self, key) -> Text:
+        """
+        Trust tokens signed by key.
+        :param key: a SnowflakeKeypair, an RSAPrivateKey or an RSAPublicKey
+        :return: the key's fingerprint
+        """
+        match key:
+            case rsa.RSAPublicKey():
+                public_key = key
+            case rsa.RSAPrivateKey():
+                public_key = key.public_key()
+            case _:
+                # SnowflakeKeypair memoizes its fingerprint
+                (fingerprint, public_key) = (key.public_key_fingerprint, key.public_key)
+                self._public_keys[fingerprint] = public_key
+                return fingerprint
+        fingerprint = JWTGenerator.calculate_public_key_fingerprint_public(public_key)
+        self._public_keys[fingerprint] = public_key
+        return fingerprint
+
+    def add_keystore(self, keystore) -> tuple:
+        return tuple(self.add(keypair) for keypair in keystore)
+
+    @classmethod
+    def from_keys(cls, *keys, **kwargs):
+        verifier = cls(**kwargs)
+        for key in keys:
+            verifier.add(key)
+        return verifier
+
+    def verify(self, token: Text, now=None) -> dict:
+        """
+        Check that token is an RS256 JWT with JWTGenerator's claims, signed by a known key and valid at now.
+        :return: the token's claims
+        """
+        try:
+            signing_input, _, signature = token.encode("ascii").rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            if header_segment != RS256Signer.header_segment:
+                header = json.loads(base64url_decode(header_segment))
+                if header.get("alg") != JWTGenerator.ALGORITHM:
+                    raise InvalidAlgorithmError(
+                        f"The specified alg value is not allowed: {header.get('alg')}"
+                    )
+            payload = json.loads(base64url_decode(payload_segment))
+            signature = base64url_decode(signature)
+        except InvalidTokenError:
+            raise
+        except (ValueError, TypeError, AttributeError) as e:
+            raise DecodeError(f"Invalid token: {e}") from e
+        if not isinstance(payload, dict):
+            raise DecodeError("Invalid payload: must be a JSON object")
+        for claim in ("iss", "sub", "iat", "exp"):
+            if claim not in payload:
+                raise MissingRequiredClaimError(claim)
+        for claim in ("iat", "exp"):
+            # bool is an int, but not a timestamp
+            if isinstance(payload[claim], bool) or not isinstance(
+                payload[claim], (int, float)
+            ):
+                raise DecodeError(f"{claim} claim must be a number")
+        # the issuer is <qualified username>.<fingerprint>: fingerprints never contain "."
+        qualified_username, _, fingerprint = str(payload["iss"]).rpartition(".")
+        if (public_key := self._public_keys.get(fingerprint)) is None:
+            raise InvalidIssuerError(f"Unknown public key fingerprint: {fingerprint}")
+        try:
+            public_key.verify(signature, signing_input, PKCS1v15(), SHA256())
+        except InvalidSignature as e:
+            raise InvalidSignatureError("Signature verification failed") from e
+        if payload["sub"] != qualified_username:
+            raise InvalidTokenError("Subject does not match the issuer")
+        timestamp = (now or datetime.now(timezone.utc)).timestamp()
+        leeway = self.leeway.total_seconds()
+        if payload["exp"] <= timestamp - leeway:
+            raise ExpiredSignatureError("Signature has expired")
+        if payload["iat"] > timestamp + leeway:
+            raise ImmatureSignatureError("The token is not yet valid (iat)")
+        return payload
+
+    def verify_many(self, tokens, now=None) -> tuple:
+        """
+        Verify many tokens against the same now.
+        :return: one item per token: its claims, or the InvalidTokenError it failed with
+        """
+        now = now or datetime.now(timezone.utc)
+
+        def verify_one(token):
+            try:
+                return self.verify(token, now=now)
+            except InvalidTokenError as e:
+                return e
+
+        return tuple(map(verify_one, tokens))
@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+
+from attr import (
+    define,
+    field,
+)
+from attr.validators import (
+    ge,
+    instance_of,
+)
+
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
+
+
+@define
+class KeypairPool:
+    """
+    Keeps pre-generated keypairs ready so that acquiring one doesn't block on RSA prime search. A daemon thread refills
+    the pool up to high_watermark whenever it drops below low_watermark. When the pool is empty, acquire falls back to
+    generating a keypair synchronously.
+    """
+
+    low_watermark: int = field(default=4, validator=[instance_of(int), ge(1)])
+    high_watermark: int = field(default=16, validator=[instance_of(int), ge(1)])
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    _keypairs: deque = field(factory=deque, init=False, repr=False)
+    _condition: threading.Condition = field(
+        factory=threading.Condition, init=False, repr=False
+    )
+    _thread = field(default=None, init=False, repr=False)
+    _stopping: bool = field(default=False, init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        if self.low_watermark > self.high_watermark:
+            raise ValueError(
+                f"low_watermark must be less than or equal to high_watermark but {self.low_watermark} > {self.high_watermark}"
+            )
+
+    def __len__(self):
+        return len(self._keypairs)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _needs_refill(self):
+        return self._stopping or len(self._keypairs) < self.low_watermark
+
+    def _refill(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._needs_refill)
+                if self._stopping:
+                    return
+            while len(self._keypairs) < self.high_watermark and not self._stopping:
+                # generate outside the lock so acquire never waits on us
+                keypair = SnowflakeKeypair.generate()
+                with self._condition:
+                    self._keypairs.append(keypair)
+                    self._condition.notify_all()
+
+    def start(self):
+        if self._stopping and self.is_running:
+            raise ValueError("the refill thread is still stopping: call stop again")
+        if not self.is_running:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._refill, name=f"{type(self).__name__}-refill", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            # keep a thread that outlived timeout: start must not run a second one
+            if not self._thread.is_alive():
+                self._thread = None
+
+    def acquire(self, password=None):
+        with self._condition:
+            try:
+                keypair = self._keypairs.popleft()
+                self.hits += 1
+            except IndexError:
+                keypair = None
+                self.misses += 1
+            if len(self._keypairs) < self.low_watermark:
+                self._condition.notify()
+        if keypair is None:
+            return SnowflakeKeypair.generate(password=password)
+        return keypair if password is None else keypair.with_password(password)
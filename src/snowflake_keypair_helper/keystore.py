@@ -0,0 +1,320 @@
+import json
+import mmap
+import os
+from pathlib import Path
+
+from attr import (
+    define,
+    field,
+)
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    PrivateFormat,
+)
+
+from snowflake_keypair_helper.constants import (
+    snowflake_connection_name_formatter,
+    snowflake_env_var_prefix,
+)
+from snowflake_keypair_helper.enums import (
+    SnowflakeFields,
+)
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
+
+
+keystore_magic = b"SKHKEYSTORE1\n"
+keystore_header_length_size = 8
+
+
+def make_account_user_key(account, user):
+    # unquoted snowflake identifiers are case insensitive
+    return (account.upper(), user.upper())
+
+
+def gen_env_entries(ctx):
+    # yields (prefix, connection_name, keypair, account, user) for every profile with a private key
+    from snowflake_keypair_helper.utils.con_utils import (
+        get_connection_names,
+        make_env_name,
+    )
+
+    prefixes_connection_names = ((snowflake_env_var_prefix, None),) + tuple(
+        (
+            snowflake_connection_name_formatter.format(connection_name=connection_name),
+            connection_name,
+        )
+        for connection_name in get_connection_names(ctx)
+    )
+    for prefix, connection_name in prefixes_connection_names:
+        if make_env_name(SnowflakeFields.private_key, prefix=prefix) not in ctx:
+            continue
+        keypair = SnowflakeKeypair.from_environment(ctx=ctx, prefix=prefix)
+        account, user = (
+            ctx.get(make_env_name(name, prefix=prefix))
+            for name in (SnowflakeFields.account, SnowflakeFields.user)
+        )
+        yield (prefix, connection_name, keypair, account, user)
+
+
+@define
+class KeyStore:
+    """
+    Holds many keypairs in memory, indexed by public key fingerprint, by (account, user) and by connection name. All
+    lookups are dict lookups: no PEM is parsed after a keypair has been added.
+    """
+
+    _by_fingerprint: dict = field(factory=dict, init=False, repr=False)
+    _by_account_user: dict = field(factory=dict, init=False, repr=False)
+    _by_connection_name: dict = field(factory=dict, init=False, repr=False)
+
+    def __len__(self):
+        return len(self._by_fingerprint)
+
+    def __iter__(self):
+        return iter(self._by_fingerprint.values())
+
+    def __contains__(self, keypair_or_fingerprint):
+        if isinstance(keypair_or_fingerprint, SnowflakeKeypair):
+            keypair_or_fingerprint = keypair_or_fingerprint.public_key_fingerprint
+        return keypair_or_fingerprint in self._by_fingerprint
+
+    @property
+    def account_users(self):
+        return tuple(self._by_account_user)
+
+    @property
+    def connection_names(self):
+        return tuple(self._by_connection_name)
+
+    def add(self, keypair, account=None, user=None, connection_name=None):
+        fingerprint = keypair.public_key_fingerprint
+        self._by_fingerprint[fingerprint] = keypair
+        if account is not None and user is not None:
+            self._by_account_user[make_account_user_key(account, user)] = fingerprint
+        if connection_name is not None:
+            self._by_connection_name[connection_name] = fingerprint
+        return fingerprint
+
+    def get_by_fingerprint(self, fingerprint, default=None):
+        return self._by_fingerprint.get(fingerprint, default)
+
+    def get_by_account_user(self, account, user, default=None):
+        fingerprint = self._by_account_user.get(make_account_user_key(account, user))
+        return self._by_fingerprint.get(fingerprint, default)
+
+    def get_by_connection_name(self, connection_name, default=None):
+        fingerprint = self._by_connection_name.get(connection_name)
+        return self._by_fingerprint.get(fingerprint, default)
+
+    def add_environment(self, ctx):
+        return tuple(
+            self.add(
+                keypair,
+                account=account,
+                user=user,
+                connection_name=connection_name,
+            )
+            for (_, connection_name, keypair, account, user) in gen_env_entries(ctx)
+        )
+
+    def add_env_path(self, path):
+        from snowflake_keypair_helper.utils.env_utils import parse_env_path
+
+        return self.add_environment(parse_env_path(path))
+
+    @classmethod
+    def from_env_paths(cls, *paths):
+        keystore = cls()
+        for path in paths:
+            keystore.add_env_path(path)
+        return keystore
+
+
+def write_keystore_path(path, entries, password):
+    """
+    Write many keypairs to a single keystore file. The layout is the magic bytes, the length of the JSON header, the
+    JSON header (an index of fingerprint -> (offset, length) and of profile entries) and then one encrypted PKCS8 DER
+    blob per distinct key. Every blob is encrypted with password. Prefixes must be unique: entries are exported and
+    looked up by prefix.
+    :param entries: iterable of (prefix, connection_name, keypair, account, user)
+    """
+    (blobs, index, header_entries, offset, prefixes) = ([], {}, [], 0, set())
+    for prefix, connection_name, keypair, account, user in entries:
+        if prefix in prefixes:
+            raise ValueError(f"duplicate prefix {prefix!r}")
+        prefixes.add(prefix)
+        fingerprint = keypair.public_key_fingerprint
+        if fingerprint not in index:
+            blob = keypair.with_password(password).get_private_bytes(
+                encoding=Encoding.DER, format=PrivateFormat.PKCS8, encrypted=True
+            )
+            index[fingerprint] = (offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+        header_entries.append(
+            {
+                "prefix": prefix,
+                "connection_name": connection_name,
+                "fingerprint": fingerprint,
+                "account": account,
+                "user": user,
+            }
+        )
+    header = json.dumps({"blobs": index, "entries": header_entries}).encode("utf-8")
+    # write then rename so readers never see a partial file
+    tmp_path = (path := Path(path)).with_name(f".{path.name}.tmp")
+    try:
+        with tmp_path.open("wb") as fh:
+            fh.write(keystore_magic)
+            fh.write(len(header).to_bytes(keystore_header_length_size, "big"))
+            fh.write(header)
+            for blob in blobs:
+                fh.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+@define
+class KeyStoreFile:
+    """
+    Reads a file written by write_keystore_path through mmap. Only the header is parsed on open: getting a keypair
+    costs one index lookup and one decrypt of its blob, regardless of how many keys the file holds.
+    """
+
+    path: Path = field(converter=Path)
+    password: str = field(repr=False)
+    _mmap: mmap.mmap = field(init=False, repr=False)
+    _data_offset: int = field(init=False, repr=False)
+    _blobs: dict = field(init=False, repr=False)
+    _entries: tuple = field(init=False, repr=False)
+    _by_prefix: dict = field(init=False, repr=False)
+    _by_connection_name: dict = field(init=False, repr=False)
+    _by_account_user: dict = field(init=False, repr=False)
+    _keypairs: dict = field(factory=dict, init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        with self.path.open("rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        header_offset = len(keystore_magic) + keystore_header_length_size
+        if self._mmap[: len(keystore_magic)] != keystore_magic:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a keystore file")
+        header_length = int.from_bytes(
+            self._mmap[len(keystore_magic) : header_offset], "big"
+        )
+        self._data_offset = header_offset + header_length
+        header = json.loads(self._mmap[header_offset : self._data_offset])
+        self._blobs = header["blobs"]
+        self._entries = tuple(header["entries"])
+        self._by_prefix = {entry["prefix"]: entry for entry in self._entries}
+        self._by_connection_name = {
+            entry["connection_name"]: entry
+            for entry in self._entries
+            if entry["connection_name"] is not None
+        }
+        self._by_account_user = {
+            make_account_user_key(entry["account"], entry["user"]): entry
+            for entry in self._entries
+            if entry["account"] is not None and entry["user"] is not None
+        }
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    @property
+    def fingerprints(self):
+        return tuple(self._blobs)
+
+    @property
+    def prefixes(self):
+        return tuple(self._by_prefix)
+
+    def get_by_fingerprint(self, fingerprint, default=None):
+        if (keypair := self._keypairs.get(fingerprint)) is None:
+            try:
+                (offset, length) = self._blobs[fingerprint]
+            except KeyError:
+                return default
+            start = self._data_offset + offset
+            keypair = self._keypairs[fingerprint] = SnowflakeKeypair.from_bytes_der(
+                self._mmap[start : start + length], self.password
+            )
+        return keypair
+
+    def _get_by_entry(self, entry, default):
+        if entry is None:
+            return default
+        return self.get_by_fingerprint(entry["fingerprint"], default)
+
+    def get_by_prefix(self, prefix, default=None):
+        return self._get_by_entry(self._by_prefix.get(prefix), default)
+
+    def get_by_connection_name(self, connection_name, default=None):
+        return self._get_by_entry(
+            self._by_connection_name.get(connection_name), default
+        )
+
+    def get_by_account_user(self, account, user, default=None):
+        return self._get_by_entry(
+            self._by_account_user.get(make_account_user_key(account, user)), default
+        )
+
+    def gen_entries(self):
+        for entry in self._entries:
+            yield (
+                entry["prefix"],
+                entry["connection_name"],
+                self.get_by_fingerprint(entry["fingerprint"]),
+                entry["account"],
+                entry["user"],
+            )
+
+    def to_keystore(self):
+        keystore = KeyStore()
+        for _, connection_name, keypair, account, user in self.gen_entries():
+            keystore.add(
+                keypair, account=account, user=user, connection_name=connection_name
+            )
+        return keystore
+
+    def to_env_text(self, export: bool = False):
+        # every profile gets the keystore password as its PRIVATE_KEY_PWD, not the one it was read with
+        from snowflake_keypair_helper.utils.con_utils import make_env_name
+
+        def gen_env_texts():
+            for prefix, _, keypair, account, user in self.gen_entries():
+                yield keypair.to_env_text(prefix=prefix, export=export)
+                for name, value in (
+                    (SnowflakeFields.account, account),
+                    (SnowflakeFields.user, user),
+                ):
+                    if value is not None:
+                        yield f"{'export ' if export else ''}{make_env_name(name, prefix=prefix)}='{value}'"
+
+        return "\n".join(gen_env_texts())
+
+    @classmethod
+    def write_from_env_paths(cls, path, password, *env_paths):
+        # writes path from the env files, then opens it
+        from snowflake_keypair_helper.utils.env_utils import parse_env_path
+
+        entries = (
+            entry
+            for env_path in env_paths
+            for entry in gen_env_entries(parse_env_path(env_path))
+        )
+        return cls(write_keystore_path(path, entries, password), password)
@@ -1,3 +1,4 @@
+import itertools
 import os
 from dataclasses import (
     dataclass,
@@ -37,33 +38,71 @@ from snowflake_keypair_helper.utils.general_utils import (
 )
 
 
+def generate_private_key():
+    return rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048,
+    )
+
+
+def generate_private_bytes_der():
+    # for use in worker processes: rsa keys don't pickle, unencrypted DER does
+    return generate_private_key().private_bytes(
+        encoding=Encoding.DER,
+        format=PrivateFormat.PKCS8,
+        encryption_algorithm=NoEncryption(),
+    )
+
+
 @dataclass(frozen=True)
 class SnowflakeKeypair:
     private_key: rsa.RSAPrivateKey
     private_key_pwd: str = field(default_factory=make_private_key_pwd, repr=False)
+    # serializations are memoized per instance: with_password creates a new instance
+    _serialization_cache: dict = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
     prefix = snowflake_env_var_prefix
     default_path = default_env_path
 
     __post_init__ = validate_dataclass_types
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, SnowflakeKeypair):
+            return NotImplemented
+        # the public key fingerprint identifies the private key
         us, them = (
-            (type(el), el.private_key.private_numbers(), el.private_key_pwd)
+            (type(el), el.public_key_fingerprint, el.private_key_pwd)
             for el in (self, other)
         )
         return all(us_el == them_el for us_el, them_el in zip(us, them))
 
+    def __hash__(self):
+        return hash(self.public_key_fingerprint)
+
+    def _memoize(self, key, f):
+        try:
+            value = self._serialization_cache[key]
+        except KeyError:
+            value = self._serialization_cache[key] = f()
+        return value
+
     def get_private_bytes(
         self, encoding=Encoding.PEM, format=PrivateFormat.PKCS8, encrypted=True
     ):
-        return self.private_key.private_bytes(
-            encoding=encoding,
-            format=format,
-            encryption_algorithm=BestAvailableEncryption(
-                encode_utf8(self.private_key_pwd)
-            )
-            if encrypted
-            else NoEncryption(),
+        return self._memoize(
+            (encoding, format, encrypted),
+            lambda: self.private_key.private_bytes(
+                encoding=encoding,
+                format=format,
+                encryption_algorithm=BestAvailableEncryption(
+                    encode_utf8(self.private_key_pwd)
+                )
+                if encrypted
+                else NoEncryption(),
+            ),
         )
 
     @property
@@ -88,15 +127,27 @@ class SnowflakeKeypair:
 
     @property
     def public_bytes(self):
-        return self.public_key.public_bytes(
-            encoding=Encoding.PEM,
-            format=PublicFormat.SubjectPublicKeyInfo,
+        return self._memoize(
+            (Encoding.PEM, PublicFormat.SubjectPublicKeyInfo),
+            lambda: self.public_key.public_bytes(
+                encoding=Encoding.PEM,
+                format=PublicFormat.SubjectPublicKeyInfo,
+            ),
         )
 
     @property
     def public_str(self):
         return decode_ascii(self.public_bytes)
 
+    @property
+    def public_key_fingerprint(self):
+        from snowflake_keypair_helper.jwt_generator import JWTGenerator
+
+        return self._memoize(
+            "public_key_fingerprint",
+            lambda: JWTGenerator.calculate_public_key_fingerprint(self.private_key),
+        )
+
     def with_password(self, private_key_pwd):
         return replace(self, private_key_pwd=private_key_pwd)
 
@@ -162,12 +213,44 @@ class SnowflakeKeypair:
 
     @classmethod
     def generate(cls, password=None):
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        private_key = generate_private_key()
         return cls(private_key, *filter_none_one(password))
 
+    @classmethod
+    def generate_many(cls, n, workers=None, passwords=None):
+        # yields keypairs in completion order, not submission order
+        # multiprocessing is slow to import: only pay for it here
+        from concurrent.futures import (
+            FIRST_COMPLETED,
+            ProcessPoolExecutor,
+            wait,
+        )
+
+        if passwords is None:
+            passwords = (None,) * n
+        elif len(passwords := tuple(passwords)) != n:
+            raise ValueError(f"expected {n} passwords, got {len(passwords)}")
+        workers = workers or os.cpu_count() or 1
+        # at most two keys per worker are in flight: a caller that stops early only waits for those
+        (passwords, window, future_to_password) = (iter(passwords), 2 * workers, {})
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            while True:
+                for password in itertools.islice(
+                    passwords, window - len(future_to_password)
+                ):
+                    future = executor.submit(generate_private_bytes_der)
+                    future_to_password[future] = password
+                if not future_to_password:
+                    break
+                (done, _) = wait(future_to_password, return_when=FIRST_COMPLETED)
+                for future in done:
+                    private_key = load_der_private_key(future.result(), None)
+                    password = future_to_password.pop(future)
+                    yield cls(private_key, *filter_none_one(password))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
     @classmethod
     def from_bytes_pem(
         cls, private_bytes: bytes, private_key_pwd: Optional[str] = None
@@ -221,7 +304,7 @@ class SnowflakeKeypair:
 
     @classmethod
     def from_env_path(cls, path=default_path, prefix=prefix):
-        from snowflake_keypair_helper.utils.env_utils import parse_env_path
+        from snowflake_keypair_helper.utils.env_utils import parse_env_path_cached
 
-        ctx = parse_env_path(path)
+        ctx = parse_env_path_cached(path)
         return cls.from_environment(ctx=ctx, prefix=prefix)
@@ -1,9 +1,17 @@
+import threading
+
 import pytest
 
 from snowflake_keypair_helper.constants import (
     gh_test_role,
     gh_user,
 )
+from snowflake_keypair_helper.jwt_generator import (
+    JWTGenerator,
+)
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
 from snowflake_keypair_helper.utils.con_utils import (
     connect_env,
     execute_statements,
@@ -23,3 +31,94 @@ def pytest_runtest_setup(item):
     if any(mark.name == "needs_gh_test_role_access" for mark in item.iter_markers()):
         if not have_gh_test_role_access:
             pytest.skip("cannot run X without Y")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def jwt_generator():
+    return JWTGenerator(
+        account="myaccount.us-east-1",
+        user="myuser",
+        private_key=SnowflakeKeypair.generate().private_key,
+    )
+
+
+class FakeAdbcCursor:
+    def __init__(self, adbc_con):
+        self.adbc_con = adbc_con
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def adbc_ingest(self, table_name, reader, mode, temporary=False, **kwargs):
+        self.adbc_con.release.wait()
+        if self.adbc_con.fail:
+            raise RuntimeError("ingest failed")
+        self.adbc_con.ingests.append((table_name, mode, reader.read_all().num_rows))
+        self.adbc_con.ingested.set()
+
+    def execute(self, statement):
+        self.adbc_con.statements.append(statement)
+
+
+class FakeAdbcConnection:
+    # the parts of an adbc_driver_manager.dbapi.Connection that we use
+    def __init__(self, fail=False):
+        self.fail = fail
+        # ingests wait for release
+        self.release = threading.Event()
+        self.release.set()
+        # set by every ingest
+        self.ingested = threading.Event()
+        self.ingests = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.clones = []
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def cursor(self):
+        return FakeAdbcCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def adbc_clone(self):
+        self.clones.append(clone := type(self)(fail=self.fail))
+        return clone
+
+    def close(self):
+        self._closed = True
+
+
+@pytest.fixture
+def make_adbc_con():
+    return FakeAdbcConnection
@@ -0,0 +1,106 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+import pytest
+
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+    make_digest,
+)
+
+
+def test_make_digest_length_prefixed():
+    assert make_digest("ab", "c") != make_digest("a", "bc")
+    assert make_digest(b"a", None) != make_digest(b"a", "")
+    assert make_digest("a", b"b") == make_digest(b"a", "b")
+
+
+def test_lru_eviction():
+    cache = TTLLRUCache(maxsize=2)
+    cache.set("a", 0)
+    cache.set("b", 1)
+    assert cache.get("a") == 0
+    cache.set("c", 2)
+    assert "b" not in cache
+    assert ("a" in cache, "c" in cache) == (True, True)
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 0, 1)
+
+
+def test_ttl_expiry(clock):
+    cache = TTLLRUCache(ttl=10, clock=clock)
+    cache.set("a", 0)
+    clock.now = 9.9
+    assert cache.get("a") == 0
+    clock.now = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_get_or_set_calls_once():
+    cache = TTLLRUCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_set("a", lambda: calls.append(None) or len(calls)) == 1
+    assert len(calls) == 1
+
+
+def test_touch_and_on_evict(clock):
+    evicted = []
+    cache = TTLLRUCache(
+        ttl=10,
+        touch=True,
+        clock=clock,
+        on_evict=lambda key, value: evicted.append((key, value)),
+    )
+    cache.set("a", 0)
+    cache.set("b", 1)
+    clock.now = 9
+    # a hit restarts the ttl: ttl is an idle timeout
+    assert cache.get("a") == 0
+    clock.now = 15
+    assert cache.evict_expired() == 1
+    assert evicted == [("b", 1)]
+    assert cache.get("a") == 0
+    cache.clear()
+    assert evicted == [("b", 1), ("a", 0)]
+
+
+def test_get_or_set_single_flight():
+    (cache, calls, release) = (TTLLRUCache(), [], threading.Event())
+
+    def f():
+        calls.append(None)
+        release.wait()
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = tuple(executor.submit(cache.get_or_set, "a", f) for _ in range(4))
+        # every thread has missed before the computing one finishes
+        while cache.misses < 4:
+            sleep(0.01)
+        release.set()
+    assert [future.result() for future in futures] == [1] * 4
+    assert len(calls) == 1
+
+
+def test_get_or_set_error_retried():
+    cache = TTLLRUCache()
+
+    def fail():
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError, match="failed"):
+        cache.get_or_set("a", fail)
+    assert not cache._in_flight
+    assert cache.get_or_set("a", lambda: 0) == 0
+
+
+def test_contains_does_not_touch(clock):
+    cache = TTLLRUCache(ttl=10, touch=True, clock=clock)
+    cache.set("a", 0)
+    clock.now = 9
+    assert "a" in cache
+    clock.now = 10
+    assert "a" not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
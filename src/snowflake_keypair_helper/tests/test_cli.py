@@ -13,6 +13,9 @@ from snowflake_keypair_helper.constants import (
     gh_test_user,
     snowflake_env_var_prefix,
 )
+from snowflake_keypair_helper.utils.con_utils import (
+    get_connection_names,
+)
 from snowflake_keypair_helper.utils.env_utils import (
     parse_env_path,
 )
@@ -110,3 +113,16 @@ def test_assign_public_key_from_path(args, tmp_path, monkeypatch):
         command, gh_test_user, "--path", str(path)
     )
     assert returncode == 0
+
+
+@pytest.mark.skipif(
+    bool(get_connection_names()), reason="os.environ has connection profiles"
+)
+def test_validate_credentials_all_connections_none_found(tmp_path):
+    path = tmp_path.joinpath("empty.env")
+    path.write_text("")
+    (returncode, out, err, _) = do_popen_communicate(
+        "skh-validate-credentials", "--all-connections", "--env-path", str(path)
+    )
+    assert returncode == 1
+    assert "no connection profiles found" in err
@@ -1,3 +1,8 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import pytest
 from cryptography.hazmat.primitives.serialization import (
     Encoding,
@@ -12,10 +17,19 @@ from snowflake_keypair_helper.constants import (
 )
 from snowflake_keypair_helper.snowflake_keypair import SnowflakeKeypair
 from snowflake_keypair_helper.utils.con_utils import (
+    AdbcHandle,
+    ConnectionPool,
+    adbc_handles,
+    adbc_ingest,
     assign_public_key,
+    close_adbc_handle,
     con_to_adbc_con,
     connect_env_keypair,
+    connect_many,
     deassign_public_key,
+    get_adbc_handle,
+    get_env_vars,
+    resolve_connect_env_kwargs,
 )
 
 
@@ -32,6 +46,121 @@ def keypair_from_env():
     return keypair
 
 
+def test_get_env_vars_ctx():
+    ctx = {"SNOWFLAKE_USER": "myuser", "SNOWFLAKE_ROLE": "myrole"}
+    actual = get_env_vars("user", "role", "warehouse", prefix="SNOWFLAKE_", ctx=ctx)
+    assert actual == {"user": "myuser", "role": "myrole"}
+
+
+def test_resolve_connect_env_kwargs_threads(tmp_path):
+    prefix = "SKH_TEST_"
+    keypairs_paths = tuple(
+        (
+            keypair := SnowflakeKeypair.generate(),
+            keypair.to_env_path(tmp_path.joinpath(f"{i}.env"), prefix=prefix),
+        )
+        for i in range(2)
+    )
+    environ = dict(os.environ)
+
+    def resolve(keypair_path):
+        (keypair, path) = keypair_path
+        kwargs = resolve_connect_env_kwargs(env_path=path, prefix=prefix, user="u")
+        expected = keypair.get_private_bytes(encoding=Encoding.DER, encrypted=False)
+        return kwargs["private_key"] == expected
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(executor.map(resolve, keypairs_paths * 16))
+    assert dict(os.environ) == environ
+
+
+class FakeConnection:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_pool(clock):
+    pool = ConnectionPool(
+        max_size=1,
+        idle_timeout=timedelta(seconds=10),
+        connect=FakeConnection,
+        clock=clock,
+    )
+    with pool.acquire(connection_name="a") as con0:
+        # a second borrower of the same key gets its own connection
+        with pool.acquire(connection_name="a") as con1:
+            assert con1 is not con0
+    # max_size: only the first one released was kept
+    assert len(pool) == 1 and con0.closed
+    with pool.acquire(connection_name="a") as con:
+        assert con is con1
+    with pool.acquire(connection_name="b", role="other") as con:
+        assert con is not con1 and con.kwargs["role"] == "other"
+    assert (pool.hits, pool.misses) == (1, 3)
+    # health check on borrow
+    con1.close()
+    with pool.acquire(connection_name="a") as con:
+        assert con is not con1
+    # idle timeout
+    clock.now = 10
+    assert pool.evict_idle() == 2
+    assert len(pool) == 0 and con.closed
+    with pool.acquire(connection_name="a") as con:
+        pass
+    pool.close()
+    assert con.closed
+
+
+def test_connection_pool_session_parameters():
+    pool = ConnectionPool(connect=FakeConnection)
+    session_parameters = {"QUERY_TAG": "skh", "TIMEZONE": "UTC"}
+    with pool.acquire(session_parameters=session_parameters) as con0:
+        pass
+    with pool.acquire(
+        session_parameters=dict(reversed(session_parameters.items()))
+    ) as con1:
+        assert con1 is con0
+    with pool.acquire(session_parameters={"QUERY_TAG": "other"}) as con2:
+        assert con2 is not con0
+    with pytest.raises(ValueError, match="cannot make a connection key"):
+        with pool.acquire(session_parameters={"QUERY_TAG": bytearray()}):
+            pass
+    pool.close()
+
+
+def test_connect_many(tmp_path):
+    path = tmp_path.joinpath(".env")
+    path.write_text(
+        "\n".join(
+            f"SNOWFLAKE_CONNECTIONS_{name}_USER='user_{name}'"
+            for name in ("A", "B", "BAD")
+        )
+    )
+
+    # every login waits for the other two: only passes if all three run at once
+    barrier = threading.Barrier(3, timeout=10)
+
+    def connect(connection_name, env_path, **kwargs):
+        barrier.wait()
+        if connection_name == "BAD":
+            raise DatabaseError("bad credentials")
+        return FakeConnection(connection_name=connection_name, env_path=env_path)
+
+    results = connect_many(env_path=path, max_workers=3, connect=connect)
+    assert tuple(result["connection_name"] for result in results) == ("A", "B", "BAD")
+    assert tuple(result["success"] for result in results) == (True, True, False)
+    assert all(result["seconds"] >= 0 for result in results)
+    assert all(result["con"].closed for result in results[:2])
+    assert isinstance(results[2]["error"], DatabaseError) and results[2]["con"] is None
+
+
 def test_defaults(con):
     actual = (con.database, con.schema)
     expected = (default_database, default_schema)
@@ -53,9 +182,67 @@ def test_connect_adbc_from_con(con):
     assert actual == expected
 
 
-@pytest.mark.xfail(reason="FIXME: install pyarrow")
-def test_adbc_ingest():
-    raise NotImplementedError
+def test_adbc_handle_reused(make_adbc_con, monkeypatch):
+    (con, roots) = (FakeConnection(), [])
+
+    def from_con(cls, con):
+        roots.append(root := make_adbc_con())
+        return cls(root)
+
+    monkeypatch.setattr(AdbcHandle, "from_con", classmethod(from_con))
+    handle = get_adbc_handle(con)
+    with con_to_adbc_con(con) as adbc_con0, con_to_adbc_con(con) as adbc_con1:
+        assert handle.root.clones == [adbc_con0, adbc_con1]
+    # closing clones leaves the cached root open
+    assert get_adbc_handle(con) is handle and not handle.is_closed
+    close_adbc_handle(con)
+    assert handle.is_closed
+    assert get_adbc_handle(con) is not handle
+    assert len(roots) == 2
+
+
+def test_adbc_handle_race(make_adbc_con, monkeypatch):
+    (con, winner) = (FakeConnection(), AdbcHandle(make_adbc_con()))
+    losers = []
+
+    def from_con(cls, con):
+        # another thread caches its handle while we log in
+        adbc_handles[con] = winner
+        losers.append(loser := cls(make_adbc_con()))
+        return loser
+
+    monkeypatch.setattr(AdbcHandle, "from_con", classmethod(from_con))
+    assert get_adbc_handle(con) is winner
+    (loser,) = losers
+    assert loser.is_closed and not winner.is_closed
+
+
+@pytest.mark.parametrize("fail", (False, True))
+def test_adbc_ingest(fail, make_adbc_con):
+    pa = pytest.importorskip("pyarrow")
+    (con, root) = (FakeConnection(), make_adbc_con(fail=fail))
+    adbc_handles[con] = AdbcHandle(root)
+    table = pa.table({"x": pa.array(range(10))})
+    for _ in range(2):
+        if fail:
+            with pytest.raises(RuntimeError, match="ingest failed"):
+                adbc_ingest(con, "T", table.to_reader(), mode="create_append")
+        else:
+            adbc_ingest(con, "T", table.to_reader(), mode="create_append")
+    # every call reuses the root, committing or rolling back, and leaves it open
+    assert not root.clones and not root.closed
+    expected = ([], 0, 2) if fail else ([("T", "create_append", 10)] * 2, 2, 0)
+    assert (root.ingests, root.commits, root.rollbacks) == expected
+
+
+def test_adbc_handle_closed(make_adbc_con):
+    handle = AdbcHandle(root := make_adbc_con())
+    handle.close()
+    handle.close()
+    assert handle.is_closed and root.closed
+    with pytest.raises(ValueError, match="closed"):
+        with handle.connection():
+            pass
 
 
 def test_connect_env_keypair(con, keypair_from_env):
@@ -0,0 +1,46 @@
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+)
+
+from snowflake_keypair_helper.enums import (
+    SnowflakeFields,
+)
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+)
+from snowflake_keypair_helper.utils.crypto_utils import (
+    decrypt_private_bytes_snowflake_cached,
+    maybe_decrypt_private_key_snowflake,
+)
+
+
+def test_decrypt_private_bytes_snowflake_cached():
+    keypair = SnowflakeKeypair.generate()
+    cache = TTLLRUCache()
+    (der0, der1) = (
+        decrypt_private_bytes_snowflake_cached(
+            keypair.private_bytes, keypair.private_key_pwd, cache=cache
+        )
+        for _ in range(2)
+    )
+    assert der0 is der1
+    assert der0 == keypair.get_private_bytes(encoding=Encoding.DER, encrypted=False)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_maybe_decrypt_private_key_snowflake():
+    keypair = SnowflakeKeypair.generate()
+    kwargs = maybe_decrypt_private_key_snowflake(
+        {
+            SnowflakeFields.private_key: keypair.private_str,
+            SnowflakeFields.private_key_pwd: keypair.private_key_pwd,
+        }
+    )
+    assert kwargs == {
+        SnowflakeFields.private_key: keypair.get_private_bytes(
+            encoding=Encoding.DER, encrypted=False
+        )
+    }
@@ -0,0 +1,85 @@
+import pytest
+
+from snowflake_keypair_helper.constants import (
+    snowflake_connection_name_formatter,
+)
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+)
+from snowflake_keypair_helper.utils.env_utils import (
+    iter_env_path,
+    parse_env_path,
+    parse_env_path_cached,
+    parse_env_path_shlex,
+    parse_env_text,
+)
+
+
+@pytest.mark.parametrize(
+    "text",
+    (
+        "A=1\nB='x y'\nexport C=\"q\\\"z\\\\w\\n\"\n# comment\n\nD=a#b\nE=a\\ b\nF=''\n",
+        "A='multi\nline'\nB=2",
+        "A=single-line-no-newline",
+        "A = 5\nB=a b c\n",
+        "A=\"a'b\"\nB='c\"d'\n",
+        "# comment\nA=1 B\nC=2",
+        "A='multi\nline' B=2",
+        "A=1 \nB=2\n# trailing comment",
+        "A=1#c\nB=2 C=3",
+    ),
+)
+def test_matches_shlex(text, tmp_path):
+    path = tmp_path.joinpath(".env")
+    path.write_text(text)
+    expected = parse_env_path_shlex(path)
+    assert parse_env_path(path) == expected
+    assert dict(iter_env_path(path)) == expected
+    # chunk boundaries fall inside words, quotes and escapes
+    assert dict(iter_env_path(path, chunk_size=3)) == expected
+
+
+@pytest.mark.parametrize("oneline", (True, False))
+@pytest.mark.parametrize("export", (True, False))
+def test_matches_shlex_keypairs(oneline, export, tmp_path):
+    keypair = SnowflakeKeypair.generate()
+    path = tmp_path.joinpath(".env")
+    path.write_text(
+        "\n".join(
+            keypair.to_env_text(
+                prefix=snowflake_connection_name_formatter.format(
+                    connection_name=f"connection{i}"
+                ),
+                export=export,
+                oneline=oneline,
+            )
+            for i in range(3)
+        )
+    )
+    actual = parse_env_path(path)
+    assert len(actual) == 9
+    assert actual == parse_env_path_shlex(path)
+
+
+def test_unterminated_quote():
+    with pytest.raises(ValueError, match="No closing quotation"):
+        parse_env_text("A='never closed\nB=2\n")
+
+
+def test_parse_env_path_cached(tmp_path):
+    cache = TTLLRUCache()
+    path = tmp_path.joinpath(".env")
+    path.write_text("A=1\n")
+    assert parse_env_path_cached(path, cache=cache) == {"A": "1"}
+    dct = parse_env_path_cached(path, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    # mutating the result doesn't poison the cache
+    dct["A"] = "2"
+    assert parse_env_path_cached(path, cache=cache) == {"A": "1"}
+    # a changed size (and mtime) is a new key
+    path.write_text("A=10\n")
+    assert parse_env_path_cached(path, cache=cache) == {"A": "10"}
+    assert cache.misses == 2
@@ -0,0 +1,217 @@
+import threading
+
+import pytest
+
+from snowflake_keypair_helper.utils.ingest_utils import (
+    IngestWriter,
+    parallel_ingest,
+    qualify_table_name,
+)
+
+
+pa = pytest.importorskip("pyarrow")
+
+
+def make_batch(n):
+    return pa.record_batch({"x": pa.array(range(n))})
+
+
+def test_ingest_writer_flushes_on_rows(make_adbc_con):
+    adbc_con = make_adbc_con()
+    with IngestWriter(
+        None, "t", max_rows=10, max_seconds=None, connect=lambda _: adbc_con
+    ) as writer:
+        for _ in range(5):
+            writer.write(make_batch(4))
+        writer.write(pa.table({"x": pa.array(range(3))}))
+    assert adbc_con.ingests == [("t", "create", 12), ("t", "append", 11)]
+    assert (writer.rows_written, writer.flushes) == (23, 2)
+    # committed once, at the end
+    assert (adbc_con.commits, adbc_con.closed) == (1, True)
+
+
+def test_ingest_writer_flushes_on_time(make_adbc_con):
+    adbc_con = make_adbc_con()
+    with IngestWriter(
+        None, "t", max_seconds=0.05, commit_per_flush=True, connect=lambda _: adbc_con
+    ) as writer:
+        writer.write(make_batch(1))
+        # far below max_rows and not closed yet: only the deadline can flush
+        assert adbc_con.ingested.wait(timeout=10)
+        assert adbc_con.ingests == [("t", "create", 1)]
+        writer.write(make_batch(2))
+    assert adbc_con.ingests == [("t", "create", 1), ("t", "append", 2)]
+    assert adbc_con.commits == 2
+
+
+def test_ingest_writer_backpressure(make_adbc_con):
+    adbc_con = make_adbc_con()
+    adbc_con.release.clear()
+    writer = IngestWriter(
+        None, "t", max_rows=1, max_queue=1, connect=lambda _: adbc_con
+    ).start()
+    producer = threading.Thread(
+        target=lambda: [writer.write(make_batch(1)) for _ in range(4)]
+    )
+    producer.start()
+    # one batch is being flushed, one waits in the queue: the producer is blocked
+    producer.join(0.2)
+    assert producer.is_alive()
+    adbc_con.release.set()
+    producer.join()
+    writer.close()
+    assert writer.rows_written == 4
+
+
+def test_ingest_writer_error_propagates(make_adbc_con):
+    adbc_con = make_adbc_con(fail=True)
+    writer = IngestWriter(None, "t", max_rows=1, connect=lambda _: adbc_con).start()
+    writer.write(make_batch(1))
+    with pytest.raises(RuntimeError, match="ingest failed"):
+        writer.close()
+    assert (adbc_con.commits, adbc_con.rollbacks, adbc_con.closed) == (0, 1, True)
+
+
+@pytest.mark.parametrize("staging", (False, True))
+def test_parallel_ingest(staging, make_adbc_con):
+    adbc_cons = []
+
+    def connect(_):
+        adbc_cons.append(adbc_con := make_adbc_con())
+        return adbc_con
+
+    table = pa.table({"x": pa.array(range(1000))})
+    results = parallel_ingest(
+        None,
+        "T",
+        table.to_reader(max_chunksize=10),
+        workers=3,
+        staging=staging,
+        connect=connect,
+    )
+    assert len(results) == 3
+    assert sum(result["rows"] for result in results) == 1000
+    assert all(result["rows_per_second"] is not None for result in results)
+    assert all(adbc_con.closed and adbc_con.commits for adbc_con in adbc_cons)
+    # the target is created first, then one connection per worker
+    (setup, *workers) = adbc_cons[:4]
+    assert setup.ingests == [("T", "create_append", 0)]
+    ingests = sorted(ingest for adbc_con in workers for ingest in adbc_con.ingests)
+    assert sum(rows for _, _, rows in ingests) == 1000
+    if staging:
+        assert all(
+            name.startswith("T_SKH_STAGE_") and mode == "create"
+            for name, mode, _ in ingests
+        )
+        # the merge and the drops run over ADBC connections, like the ingests
+        (merge, drop) = adbc_cons[4:]
+        ((insert,), drops) = (merge.statements, drop.statements)
+        assert insert.startswith('INSERT INTO "T" SELECT * FROM "T_SKH_STAGE_')
+        assert len(drops) == 3
+        assert all(
+            statement.startswith('DROP TABLE IF EXISTS "T_SKH_STAGE_')
+            for statement in drops
+        )
+    else:
+        assert {(name, mode) for name, mode, _ in ingests} == {("T", "append")}
+        assert len(adbc_cons) == 4
+        assert not any(adbc_con.statements for adbc_con in adbc_cons)
+
+
+def test_parallel_ingest_quotes_names(make_adbc_con):
+    adbc_cons = []
+
+    def connect(_):
+        adbc_cons.append(adbc_con := make_adbc_con())
+        return adbc_con
+
+    table = pa.table({"x": pa.array(range(10))})
+    parallel_ingest(
+        None,
+        "t",
+        table,
+        workers=2,
+        staging=True,
+        connect=connect,
+        db_schema_name="my_schema",
+    )
+    (merge, drop) = adbc_cons[-2:]
+    ((insert,), drops) = (merge.statements, drop.statements)
+    # lowercase names stay lowercase and everything lives in db_schema_name, like the ingests
+    assert insert.startswith(
+        'INSERT INTO "my_schema"."t" SELECT * FROM "my_schema"."t_SKH_STAGE_'
+    )
+    assert insert.count('"my_schema"."t_SKH_STAGE_') == 2
+    assert all(
+        statement.startswith('DROP TABLE IF EXISTS "my_schema"."t_SKH_STAGE_')
+        for statement in drops
+    )
+
+
+def test_qualify_table_name():
+    assert qualify_table_name('a"b') == '"a""b"'
+    assert qualify_table_name("t", db_schema_name="s") == '"s"."t"'
+    assert qualify_table_name("t", "c", "s") == '"c"."s"."t"'
+
+
+def test_parallel_ingest_error_propagates(make_adbc_con):
+    adbc_cons = []
+
+    def connect(_):
+        # the first worker to connect fails
+        adbc_cons.append(adbc_con := make_adbc_con(fail=len(adbc_cons) == 1))
+        return adbc_con
+
+    table = pa.table({"x": pa.array(range(1000))})
+    with pytest.raises(RuntimeError, match="ingest failed"):
+        parallel_ingest(
+            None,
+            "T",
+            table.to_batches(max_chunksize=10),
+            workers=2,
+            staging=True,
+            connect=connect,
+        )
+    # staging tables are dropped even on failure
+    drop = adbc_cons[-1]
+    assert len(drop.statements) == 2 and drop.commits == 1
+    assert all(
+        statement.startswith("DROP TABLE IF EXISTS") for statement in drop.statements
+    )
+
+
+def test_parallel_ingest_first_error(make_adbc_con):
+    class WrappedError(Exception):
+        pass
+
+    class AdbcConnection(make_adbc_con):
+        # like the driver, wrap whatever the ingest raised, including the reader's errors
+        def cursor(self):
+            cur = super().cursor()
+            adbc_ingest = cur.adbc_ingest
+
+            def wrapped(*args, **kwargs):
+                try:
+                    return adbc_ingest(*args, **kwargs)
+                except Exception as e:
+                    raise WrappedError(str(e)) from e
+
+            cur.adbc_ingest = wrapped
+            return cur
+
+    adbc_cons = []
+
+    def connect(_):
+        # the last worker to connect fails
+        adbc_cons.append(adbc_con := AdbcConnection(fail=len(adbc_cons) == 3))
+        return adbc_con
+
+    table = pa.table({"x": pa.array(range(1000))})
+    with pytest.raises(WrappedError, match="ingest failed"):
+        parallel_ingest(
+            None,
+            "T",
+            table.to_batches(max_chunksize=10),
+            workers=3,
+            connect=connect,
+        )
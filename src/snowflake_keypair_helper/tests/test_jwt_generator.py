@@ -1,13 +1,75 @@
-from datetime import timedelta
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
 from time import sleep
+from urllib.parse import parse_qs
 
+import jwt
 import pytest
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    PrivateFormat,
+)
 
 from snowflake_keypair_helper.api import (
+    KeyStore,
     SnowflakeKeypair,
     connect_env_keypair,
 )
-from snowflake_keypair_helper.jwt_generator import JWTGenerator
+from snowflake_keypair_helper.jwt_generator import (
+    JWTGenerator,
+    JWTGeneratorRegistry,
+    JWTVerifier,
+    RS256Signer,
+    live_generators,
+    load_private_key_cached,
+)
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+)
+
+
+class StubOAuthHandler(BaseHTTPRequestHandler):
+    # keep-alive, like snowflake
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        data = parse_qs(self.rfile.read(length).decode("utf-8"))
+        self.server.requests.append((self.client_address, data))
+        # numbered per scope: concurrent exchanges for different scopes may arrive in any order
+        (scope,) = data["scope"]
+        n = sum(scope == other["scope"][0] for _, other in self.server.requests)
+        body = f"{scope} exchanged-{n}".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def oauth_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOAuthHandler)
+    server.requests = []
+    server.auth_url = f"http://127.0.0.1:{server.server_port}/oauth/token"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
 
 
 @pytest.fixture
@@ -48,6 +110,53 @@ def test_from_con(con):
     assert token
 
 
+def test_from_text_cached():
+    kp = SnowflakeKeypair.generate()
+    (generator0, generator1) = (
+        JWTGenerator.from_text(
+            kp.private_str,
+            passphrase=kp.private_key_pwd,
+            account="myaccount",
+            user="myuser",
+        )
+        for _ in range(2)
+    )
+    assert generator0.private_key is generator1.private_key
+    with pytest.raises(ValueError):
+        JWTGenerator.from_text(
+            kp.private_str, passphrase="wrong", account="myaccount", user="myuser"
+        )
+
+
+def test_load_private_key_cached_der():
+    kp = SnowflakeKeypair.generate()
+    der = kp.get_private_bytes(
+        encoding=Encoding.DER, format=PrivateFormat.PKCS8, encrypted=False
+    )
+    cache = TTLLRUCache()
+    private_key = load_private_key_cached(der, cache=cache)
+    assert load_private_key_cached(bytes(der), cache=cache) is private_key
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert JWTGenerator.calculate_public_key_fingerprint(private_key) == (
+        kp.public_key_fingerprint
+    )
+
+
+def test_from_path_cached(tmp_path):
+    path = tmp_path.joinpath("key.p8")
+    (kp0, kp1) = (SnowflakeKeypair.generate() for _ in range(2))
+    path.write_text(kp0.private_str)
+    kwargs = {"passphrase": kp0.private_key_pwd, "account": "a", "user": "u"}
+    generator0 = JWTGenerator.from_path(str(path), **kwargs)
+    assert JWTGenerator.from_path(path, **kwargs).private_key is generator0.private_key
+    # a rewritten file is re-read: bump mtime in case the clock is coarse
+    mtime_ns = path.stat().st_mtime_ns
+    path.write_text(kp1.with_password(kp0.private_key_pwd).private_str)
+    os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+    generator1 = JWTGenerator.from_path(path, **kwargs)
+    assert generator1.public_key_fp == kp1.public_key_fingerprint
+
+
 def test_renewal_delay_condition(con):
     duration = 60
     with pytest.raises(
@@ -82,3 +191,359 @@ def test_lifetime_not_exceeded(con, duration):
     sleep(1)
     token1 = jwt_generator.get_token()
     assert token0 == token1
+
+
+def test_precomputed_issuer(jwt_generator):
+    assert jwt_generator.qualified_username == "MYACCOUNT.MYUSER"
+    assert jwt_generator.issuer == (
+        "MYACCOUNT.MYUSER."
+        + JWTGenerator.calculate_public_key_fingerprint(jwt_generator.private_key)
+    )
+    payload = jwt.decode(
+        jwt_generator.get_token(),
+        key=jwt_generator.private_key.public_key(),
+        algorithms=[JWTGenerator.ALGORITHM],
+    )
+    assert (payload["iss"], payload["sub"]) == (
+        jwt_generator.issuer,
+        jwt_generator.qualified_username,
+    )
+    other = jwt_generator.evolve(user="other")
+    assert other.issuer.startswith("MYACCOUNT.OTHER.SHA256:")
+
+
+@pytest.fixture
+def count_generate_token(monkeypatch):
+    calls = []
+    generate_token = JWTGenerator.generate_token
+
+    def slow_generate_token(self, now):
+        calls.append(now)
+        sleep(0.2)
+        return generate_token(self, now)
+
+    monkeypatch.setattr(JWTGenerator, "generate_token", slow_generate_token)
+    return calls
+
+
+@pytest.mark.parametrize("have_valid_token", (True, False))
+def test_single_flight_renewal(jwt_generator, count_generate_token, have_valid_token):
+    n = 8
+    if have_valid_token:
+        # renewal_delay of zero: every call wants to renew a token that stays valid
+        jwt_generator = jwt_generator.evolve(renewal_delay=timedelta(0))
+        previous = jwt_generator.get_token()
+        count_generate_token.clear()
+    barrier = threading.Barrier(n)
+
+    def get_token(_):
+        barrier.wait()
+        return jwt_generator.get_token()
+
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        tokens = tuple(executor.map(get_token, range(n)))
+    assert len(count_generate_token) == 1
+    if have_valid_token:
+        assert set(tokens) == {previous, jwt_generator.token}
+    else:
+        assert set(tokens) == {jwt_generator.token}
+
+
+def test_refresher(jwt_generator):
+    jwt_generator = jwt_generator.evolve(
+        lifetime=timedelta(seconds=2), renewal_delay=timedelta(seconds=1)
+    )
+    jwt_generator.start_refresher(lead=timedelta(seconds=0.5), jitter=timedelta(0))
+    try:
+        assert jwt_generator.is_refreshing
+        sleep(0.1)
+        token0 = jwt_generator.token
+        assert token0 is not None
+        # the refresher re-signs before renew_time without any get_token call
+        sleep(1)
+        assert jwt_generator.token != token0
+        assert jwt_generator.get_token() == jwt_generator.token
+    finally:
+        jwt_generator.stop_refresher()
+    assert not jwt_generator.is_refreshing
+
+
+def test_refresher_after_fork(jwt_generator):
+    jwt_generator.start_refresher()
+    try:
+        (thread, stop, *_) = jwt_generator._refresher
+        lock = jwt_generator._lock
+        # what the child runs: threads don't survive a fork
+        jwt_generator._after_fork_in_child()
+        assert jwt_generator._lock is not lock
+        assert not jwt_generator.is_refreshing
+    finally:
+        # in a real child the parent's thread is gone: here we stop it ourselves
+        stop.set()
+        thread.join()
+
+
+def test_session_after_fork(jwt_generator, oauth_server):
+    # generators without a refresher hold a session too
+    assert live_generators[id(jwt_generator)] is jwt_generator
+    jwt_generator.exchange_jwt(oauth_server.auth_url, "https://ingress")
+    session = jwt_generator._session
+    jwt_generator._after_fork_in_child()
+    # dropped, not closed: its pool may be locked by a thread the child doesn't have
+    assert jwt_generator._session is None
+    jwt_generator.exchange_jwt(oauth_server.auth_url, "https://ingress")
+    assert jwt_generator._session not in (None, session)
+    jwt_generator.close()
+    session.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_real_fork(jwt_generator, oauth_server):
+    jwt_generator.get_jwt(oauth_server.auth_url, "https://ingress")
+    jwt_generator.start_refresher()
+    # forked while held: the child gets a locked copy
+    with jwt_generator._lock:
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                assert not jwt_generator.is_refreshing
+                jwt_generator.refresh_token()
+                jwt = jwt_generator.get_jwt(oauth_server.auth_url, "https://ingress")
+                assert jwt == "https://ingress exchanged-2"
+                status = 0
+            finally:
+                os._exit(status)
+    try:
+        (_, wait_status) = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(wait_status) == 0
+        assert jwt_generator.is_refreshing
+    finally:
+        jwt_generator.close()
+
+
+def test_exchanged_token_cached(jwt_generator, oauth_server):
+    jwt_generator = jwt_generator.evolve(
+        auth_url=oauth_server.auth_url, ingress_url="https://ingress"
+    )
+    try:
+        headers0 = jwt_generator.get_auth_headers()
+        headers1 = jwt_generator.get_auth_headers()
+        expected = {"Authorization": 'Snowflake Token="https://ingress exchanged-1"'}
+        assert headers0 == headers1 == expected
+        headers2 = jwt_generator.get_auth_headers(role="other")
+        assert headers2 == {
+            "Authorization": 'Snowflake Token="session:role:other https://ingress exchanged-1"'
+        }
+        jwt_generator.exchange_jwt(oauth_server.auth_url, "https://ingress")
+    finally:
+        jwt_generator.close()
+    (client_addresses, datas) = zip(*oauth_server.requests)
+    # one pooled connection for all three exchanges
+    assert len(set(client_addresses)) == 1
+    assert [data["scope"] for data in datas] == [
+        ["https://ingress"],
+        ["session:role:other https://ingress"],
+        ["https://ingress"],
+    ]
+    assert datas[0]["assertion"] == [jwt_generator.token]
+
+
+def test_exchanged_token_expires(jwt_generator, oauth_server):
+    jwt_generator = jwt_generator.evolve(exchange_ttl=timedelta(seconds=0.1))
+    try:
+        jwt0 = jwt_generator.get_jwt(oauth_server.auth_url, "https://ingress")
+        sleep(0.2)
+        jwt1 = jwt_generator.get_jwt(oauth_server.auth_url, "https://ingress")
+    finally:
+        jwt_generator.close()
+    assert (jwt0, jwt1) == (
+        "https://ingress exchanged-1",
+        "https://ingress exchanged-2",
+    )
+
+
+def test_async_exchange_deduplicated(jwt_generator, oauth_server):
+    pytest.importorskip("httpx")
+    jwt_generator = jwt_generator.evolve(
+        auth_url=oauth_server.auth_url, ingress_url="https://ingress"
+    )
+
+    async def get_all_auth_headers():
+        try:
+            concurrent = await asyncio.gather(
+                *(jwt_generator.aget_auth_headers() for _ in range(8)),
+                jwt_generator.aget_auth_headers(role="other"),
+            )
+            cached = await jwt_generator.aget_auth_headers()
+            return (concurrent, cached)
+        finally:
+            await jwt_generator.aclose()
+
+    (concurrent, cached) = asyncio.run(get_all_auth_headers())
+    expected = {"Authorization": 'Snowflake Token="https://ingress exchanged-1"'}
+    assert concurrent[:8] == [expected] * 8 and cached == expected
+    assert concurrent[8] == {
+        "Authorization": 'Snowflake Token="session:role:other https://ingress exchanged-1"'
+    }
+    assert len(oauth_server.requests) == 2
+    assert all(
+        data["assertion"] == [jwt_generator.token] for _, data in oauth_server.requests
+    )
+
+
+def test_registry_shares_generators():
+    (keypair0, keypair1) = (SnowflakeKeypair.generate() for _ in range(2))
+    registry = JWTGeneratorRegistry(
+        generator_kwargs={
+            "lifetime": timedelta(minutes=5),
+            "renewal_delay": timedelta(minutes=4),
+        }
+    )
+    generator = registry.get("myaccount.us-east-1", "myuser", keypair0)
+    assert generator.lifetime == timedelta(minutes=5)
+    # same account (modulo region and case), user and key: same generator
+    assert registry.get("MYACCOUNT", "MyUser", keypair0.private_key) is generator
+    assert registry.get("myaccount", "myuser", keypair1) is not generator
+    assert registry.metrics == {"size": 2, "hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_registry_builds_once(monkeypatch):
+    private_key = SnowflakeKeypair.generate().private_key
+    (calculate, calls) = (JWTGenerator.calculate_public_key_fingerprint, [])
+
+    def counting(private_key):
+        calls.append(None)
+        return calculate(private_key)
+
+    monkeypatch.setattr(
+        JWTGenerator, "calculate_public_key_fingerprint", staticmethod(counting)
+    )
+    registry = JWTGeneratorRegistry()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        generators = tuple(
+            executor.map(
+                lambda _: registry.get("myaccount", "myuser", private_key), range(8)
+            )
+        )
+    assert len(set(map(id, generators))) == 1
+    # once per get for the key, never again in the generator
+    assert len(calls) == 8
+    assert generators[0].public_key_fp == calculate(private_key)
+    with pytest.raises(ValueError, match="maxsize"):
+        JWTGeneratorRegistry(maxsize=0)
+
+
+def test_evolve_private_key(jwt_generator):
+    keypair = SnowflakeKeypair.generate()
+    evolved = jwt_generator.evolve(private_key=keypair.private_key)
+    assert evolved.public_key_fp == keypair.public_key_fingerprint
+    assert evolved.public_key_fp != jwt_generator.public_key_fp
+
+
+def test_registry_evicts_and_closes():
+    keypairs = tuple(SnowflakeKeypair.generate() for _ in range(2))
+    registry = JWTGeneratorRegistry(maxsize=1, idle_timeout=timedelta(seconds=0.1))
+    generator0 = registry.get("myaccount", "myuser", keypairs[0])
+    generator0.start_refresher()
+    # lru eviction closes the evicted generator
+    generator1 = registry.get("myaccount", "myuser", keypairs[1])
+    assert not generator0.is_refreshing
+    assert registry.metrics["evictions"] == 1
+    # idle eviction
+    sleep(0.2)
+    assert registry.get("myaccount", "myuser", keypairs[1]) is not generator1
+    assert registry.metrics["evictions"] == 2
+    registry.close()
+    assert len(registry) == 0
+
+
+def test_mint_many():
+    keypairs = tuple(SnowflakeKeypair.generate() for _ in range(2))
+    specs = tuple((f"account{i % 3}", f"user{i}", keypairs[i % 2]) for i in range(10))
+    now = datetime.now(timezone.utc)
+    minted = JWTGenerator.mint_many(
+        specs, workers=2, chunksize=3, now=now, lifetime=timedelta(minutes=5)
+    )
+    assert len(minted) == len(specs)
+    for (account, user, keypair), (token, expire_time) in zip(specs, minted):
+        generator = JWTGenerator(
+            account=account,
+            user=user,
+            private_key=keypair.private_key,
+            lifetime=timedelta(minutes=5),
+            renewal_delay=timedelta(minutes=4),
+        )
+        generator.generate_token(now)
+        assert (token, expire_time) == (generator.token, generator.expire_time)
+        decoded = jwt.decode(
+            token, key=keypair.private_key.public_key(), algorithms=["RS256"]
+        )
+        assert decoded["sub"] == f"{account}.{user}".upper()
+        assert decoded["iss"].endswith(keypair.public_key_fingerprint)
+        assert decoded["exp"] == int(expire_time.timestamp())
+    assert JWTGenerator.mint_many(()) == ()
+
+
+@pytest.mark.parametrize("user", ("myuser", 'my"user%d'))
+def test_rs256_signer_matches_pyjwt(jwt_generator, user):
+    jwt_generator = jwt_generator.evolve(user=user)
+    now = datetime.now(timezone.utc)
+    jwt_generator.generate_token(now)
+    expected = jwt.encode(
+        {
+            "iss": jwt_generator.issuer,
+            "sub": jwt_generator.qualified_username,
+            "iat": now,
+            "exp": now + jwt_generator.lifetime,
+        },
+        key=jwt_generator.private_key,
+        algorithm=JWTGenerator.ALGORITHM,
+    )
+    assert jwt_generator.token == expected
+    assert RS256Signer.header_segment == expected.split(".")[0].encode()
+
+
+def test_verifier(jwt_generator):
+    (keypair, unknown) = (SnowflakeKeypair.generate() for _ in range(2))
+    verifier = JWTVerifier.from_keys(jwt_generator.private_key, keypair.public_key)
+    token = jwt_generator.get_token()
+    claims = verifier.verify(token)
+    assert claims == jwt.decode(
+        token, key=jwt_generator.private_key.public_key(), algorithms=["RS256"]
+    )
+    (header, payload, signature) = token.split(".")
+    tampered = ".".join((header, payload, signature[:-4] + "AAAA"))
+    expired = jwt_generator.evolve(lifetime=timedelta(0), renewal_delay=timedelta(0))
+    expired.generate_token(datetime.now(timezone.utc) - timedelta(seconds=1))
+    other = jwt_generator.evolve(private_key=unknown.private_key)
+    results = verifier.verify_many(
+        (token, tampered, expired.token, other.refresh_token(), "not.a.token")
+    )
+    assert results[0] == claims
+    assert tuple(type(result) for result in results[1:]) == (
+        jwt.InvalidSignatureError,
+        jwt.ExpiredSignatureError,
+        jwt.InvalidIssuerError,
+        jwt.DecodeError,
+    )
+    keystore = KeyStore()
+    keystore.add(unknown)
+    assert verifier.add_keystore(keystore) == (unknown.public_key_fingerprint,)
+    assert verifier.verify(other.token)["sub"] == other.qualified_username
+
+
+@pytest.mark.parametrize("claim", ("iat", "exp"))
+def test_verifier_non_numeric_claim(jwt_generator, claim):
+    verifier = JWTVerifier.from_keys(jwt_generator.private_key)
+    now = int(datetime.now(timezone.utc).timestamp())
+    payload = {
+        "iss": jwt_generator.issuer,
+        "sub": jwt_generator.qualified_username,
+        "iat": now,
+        "exp": now + 60,
+    } | {claim: "soon"}
+    # correctly signed: only the claim's type is wrong
+    token = jwt.encode(payload, jwt_generator.private_key, algorithm="RS256")
+    (result,) = verifier.verify_many((token,))
+    assert isinstance(result, jwt.DecodeError)
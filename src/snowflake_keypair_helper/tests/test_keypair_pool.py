@@ -0,0 +1,66 @@
+import pytest
+
+from snowflake_keypair_helper.keypair_pool import (
+    KeypairPool,
+)
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
+from snowflake_keypair_helper.utils.crypto_utils import (
+    generate_private_str,
+)
+
+
+def wait_for_len(pool, n, timeout=30):
+    with pool._condition:
+        assert pool._condition.wait_for(lambda: len(pool) >= n, timeout=timeout)
+
+
+def test_invalid_watermarks():
+    with pytest.raises(ValueError, match="low_watermark must be less than"):
+        KeypairPool(low_watermark=2, high_watermark=1)
+    # a pool that never refills
+    with pytest.raises(ValueError, match="low_watermark"):
+        KeypairPool(low_watermark=0)
+
+
+def test_stop_timeout():
+    pool = KeypairPool(low_watermark=1, high_watermark=1).start()
+    # holding the condition keeps the refill thread from seeing the stop
+    with pool._condition:
+        pool.stop(timeout=0)
+        assert pool.is_running
+        with pytest.raises(ValueError, match="still stopping"):
+            pool.start()
+    pool.stop()
+    assert not pool.is_running
+    pool.start().stop()
+
+
+def test_miss_when_not_started():
+    pool = KeypairPool(low_watermark=1, high_watermark=2)
+    keypair = pool.acquire(password="password0")
+    assert isinstance(keypair, SnowflakeKeypair)
+    assert keypair.private_key_pwd == "password0"
+    assert (pool.hits, pool.misses) == (0, 1)
+
+
+def test_refill_and_hit():
+    with KeypairPool(low_watermark=1, high_watermark=2) as pool:
+        wait_for_len(pool, 2)
+        keypair0 = pool.acquire()
+        keypair1 = pool.acquire(password="password1")
+        assert keypair0 != keypair1
+        assert keypair1.private_key_pwd == "password1"
+        assert (pool.hits, pool.misses) == (2, 0)
+        # dropped below low_watermark: the refill thread tops the pool back up
+        wait_for_len(pool, 2)
+    assert not pool.is_running
+
+
+def test_generate_private_str_from_pool():
+    with KeypairPool(low_watermark=1, high_watermark=1) as pool:
+        wait_for_len(pool, 1)
+        private_str = generate_private_str(password="password0", pool=pool)
+    assert pool.hits == 1
+    SnowflakeKeypair.from_str(private_str, "password0")
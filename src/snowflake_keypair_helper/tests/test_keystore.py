@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from snowflake_keypair_helper.constants import (
+    snowflake_connection_name_formatter,
+)
+from snowflake_keypair_helper.keystore import (
+    KeyStore,
+    KeyStoreFile,
+    write_keystore_path,
+)
+from snowflake_keypair_helper.snowflake_keypair import (
+    SnowflakeKeypair,
+)
+from snowflake_keypair_helper.utils.con_utils import (
+    get_connection_names,
+)
+from snowflake_keypair_helper.utils.env_utils import (
+    parse_env_path,
+)
+
+
+def write_env_path(path, keypairs_users):
+    env_text = "\n".join(
+        f"{keypair.to_env_text(prefix=prefix)}\n{prefix}ACCOUNT='myaccount'\n{prefix}USER='{user}'"
+        for prefix, (keypair, user) in keypairs_users.items()
+    )
+    path.write_text(env_text)
+    return path
+
+
+def test_get_connection_names():
+    ctx = {
+        "SNOWFLAKE_USER": "",
+        "SNOWFLAKE_CONNECTIONS_A_ROLE_USER": "",
+        "SNOWFLAKE_CONNECTIONS_B_PRIVATE_KEY_PWD": "",
+        "SNOWFLAKE_CONNECTIONS_c_PUBLIC_KEY": "",
+        "SNOWFLAKE_CONNECTIONS_D_UNKNOWN": "",
+    }
+    assert get_connection_names(ctx) == ("A_ROLE", "B", "c")
+
+
+def test_add_and_lookup():
+    keystore = KeyStore()
+    keypair = SnowflakeKeypair.generate()
+    fingerprint = keystore.add(
+        keypair, account="myaccount", user="myuser", connection_name="myconnection"
+    )
+    assert fingerprint == keypair.public_key_fingerprint
+    assert keypair in keystore and fingerprint in keystore
+    assert keystore.get_by_fingerprint(fingerprint) is keypair
+    assert keystore.get_by_account_user("MYACCOUNT", "MyUser") is keypair
+    assert keystore.get_by_connection_name("myconnection") is keypair
+    assert keystore.get_by_connection_name("other") is None
+
+
+def test_from_env_paths(tmp_path):
+    (keypair0, keypair1, keypair2) = (SnowflakeKeypair.generate() for _ in range(3))
+    connection_prefix = snowflake_connection_name_formatter.format(
+        connection_name="my_connection"
+    )
+    paths = (
+        write_env_path(
+            tmp_path.joinpath("0.env"),
+            {
+                "SNOWFLAKE_": (keypair0, "user0"),
+                connection_prefix: (keypair1, "user1"),
+            },
+        ),
+        write_env_path(
+            tmp_path.joinpath("1.env"),
+            {"SNOWFLAKE_": (keypair2, "user2")},
+        ),
+    )
+    keystore = KeyStore.from_env_paths(*paths)
+    assert len(keystore) == 3
+    assert set(keystore) == {keypair0, keypair1, keypair2}
+    assert keystore.get_by_connection_name("my_connection") == keypair1
+    assert keystore.get_by_account_user("myaccount", "user2") == keypair2
+
+
+def test_keystore_file_roundtrip(tmp_path):
+    (keypair0, keypair1) = (SnowflakeKeypair.generate() for _ in range(2))
+    connection_prefix = snowflake_connection_name_formatter.format(
+        connection_name="my_connection"
+    )
+    env_path = write_env_path(
+        tmp_path.joinpath("0.env"),
+        {
+            "SNOWFLAKE_": (keypair0, "user0"),
+            connection_prefix: (keypair1, "user1"),
+        },
+    )
+    password = "keystorepassword"
+    path = tmp_path.joinpath("keystore")
+    with KeyStoreFile.write_from_env_paths(path, password, env_path) as keystore_file:
+        assert len(keystore_file) == 2
+        assert keystore_file.prefixes == ("SNOWFLAKE_", connection_prefix)
+        keypair = keystore_file.get_by_connection_name("my_connection")
+        assert keypair == keypair1.with_password(password)
+        assert keystore_file.get_by_prefix(connection_prefix) is keypair
+        assert keystore_file.get_by_account_user("myaccount", "user0") == (
+            keypair0.with_password(password)
+        )
+        assert keystore_file.get_by_fingerprint("SHA256:missing") is None
+        keystore = keystore_file.to_keystore()
+        env_text = keystore_file.to_env_text()
+    assert keystore.get_by_connection_name("my_connection") == keypair
+    exported_path = tmp_path.joinpath("exported.env")
+    exported_path.write_text(env_text)
+    exported = KeyStore.from_env_paths(exported_path)
+    assert set(exported) == set(keystore)
+    assert parse_env_path(exported_path)[f"{connection_prefix}USER"] == "user1"
+    assert parse_env_path(exported_path)["SNOWFLAKE_PRIVATE_KEY_PWD"] == password
+
+
+def test_keystore_file_duplicate_prefix(tmp_path):
+    env_paths = tuple(
+        write_env_path(
+            tmp_path.joinpath(f"{i}.env"),
+            {"SNOWFLAKE_": (SnowflakeKeypair.generate(), f"user{i}")},
+        )
+        for i in range(3)
+    )
+    path = tmp_path.joinpath("keystore")
+    with pytest.raises(ValueError, match="duplicate prefix 'SNOWFLAKE_'"):
+        KeyStoreFile.write_from_env_paths(path, "keystorepassword", *env_paths)
+    assert not path.exists()
+
+
+def test_keystore_file_bad_magic(tmp_path):
+    path = tmp_path.joinpath("not-a-keystore")
+    path.write_bytes(b"SNOWFLAKE_USER=user")
+    with pytest.raises(ValueError, match="is not a keystore file"):
+        KeyStoreFile(path, "password")
+
+
+def test_write_keystore_path_cleans_up(tmp_path, monkeypatch):
+    def fail(*args):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(os, "replace", fail)
+    path = tmp_path.joinpath("keystore")
+    entries = (("SNOWFLAKE_", None, SnowflakeKeypair.generate(), None, None),)
+    with pytest.raises(OSError, match="replace failed"):
+        write_keystore_path(path, entries, "keystorepassword")
+    assert not tuple(tmp_path.iterdir())
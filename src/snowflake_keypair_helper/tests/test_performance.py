@@ -1,7 +1,43 @@
+import os
 import subprocess
+from datetime import (
+    datetime,
+    timezone,
+)
 
+import jwt
 import pytest
 
+from snowflake_keypair_helper.constants import snowflake_connection_name_formatter
+from snowflake_keypair_helper.jwt_generator import (
+    JWTGenerator,
+    JWTVerifier,
+)
+from snowflake_keypair_helper.snowflake_keypair import SnowflakeKeypair
+from snowflake_keypair_helper.utils.env_utils import (
+    parse_env_path,
+    parse_env_path_shlex,
+)
+
+
+@pytest.fixture(scope="module")
+def large_env_path(tmp_path_factory):
+    keypair = SnowflakeKeypair.generate()
+    path = tmp_path_factory.mktemp("env").joinpath(".env")
+    path.write_text(
+        "\n".join(
+            keypair.to_env_text(
+                prefix=snowflake_connection_name_formatter.format(
+                    connection_name=f"connection{i}"
+                ),
+                export=True,
+                oneline=False,
+            )
+            for i in range(200)
+        )
+    )
+    return path
+
 
 @pytest.mark.benchmark
 @pytest.mark.parametrize(
@@ -11,10 +47,14 @@ import pytest
         "snowflake_keypair_helper.api",
         "snowflake_keypair_helper.cli",
         "snowflake_keypair_helper.constants",
+        "snowflake_keypair_helper.keypair_pool",
+        "snowflake_keypair_helper.keystore",
+        "snowflake_keypair_helper.utils.cache_utils",
         "snowflake_keypair_helper.utils.con_utils",
         "snowflake_keypair_helper.utils.crypto_utils",
         "snowflake_keypair_helper.utils.dataclass_utils",
         "snowflake_keypair_helper.utils.env_utils",
+        "snowflake_keypair_helper.utils.ingest_utils",
         "snowflake_keypair_helper.utils.init_state_utils",
     ),
 )
@@ -26,3 +66,65 @@ def test_benchmark_module_import(module):
             f"import {module}",
         )
     )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "workers",
+    sorted({1, 2, os.cpu_count() or 1}),
+)
+def test_benchmark_generate_many(workers):
+    n = 16
+    keypairs = tuple(SnowflakeKeypair.generate_many(n, workers=workers))
+    assert len(keypairs) == n
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("parse", (parse_env_path, parse_env_path_shlex))
+def test_benchmark_parse_env_path(parse, large_env_path):
+    assert len(parse(large_env_path)) == 600
+
+
+@pytest.mark.benchmark
+def test_benchmark_generate_token(jwt_generator):
+    now = datetime.now(timezone.utc)
+    for _ in range(100):
+        jwt_generator.generate_token(now)
+    assert jwt_generator.token
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "workers",
+    sorted({1, 2, os.cpu_count() or 1}),
+)
+def test_benchmark_mint_many(jwt_generator, workers):
+    specs = tuple(
+        ("myaccount", f"user{i}", jwt_generator.private_key) for i in range(256)
+    )
+    assert len(JWTGenerator.mint_many(specs, workers=workers)) == len(specs)
+
+
+@pytest.mark.benchmark
+def test_benchmark_generate_token_pyjwt(jwt_generator):
+    # the path generate_token used before RS256Signer
+    now = datetime.now(timezone.utc)
+    for _ in range(100):
+        token = jwt.encode(
+            {
+                "iss": jwt_generator.issuer,
+                "sub": jwt_generator.qualified_username,
+                "iat": now,
+                "exp": now + jwt_generator.lifetime,
+            },
+            key=jwt_generator.private_key,
+            algorithm=JWTGenerator.ALGORITHM,
+        )
+    assert token
+
+
+@pytest.mark.benchmark
+def test_benchmark_verify_many(jwt_generator):
+    verifier = JWTVerifier.from_keys(jwt_generator.private_key)
+    tokens = (jwt_generator.get_token(),) * 1000
+    assert all(isinstance(claims, dict) for claims in verifier.verify_many(tokens))
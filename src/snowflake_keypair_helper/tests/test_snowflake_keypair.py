@@ -65,9 +65,20 @@ def test_from_str():
     assert keypair0 == keypair2
 
 
-def test_varying_encrypted_private_bytes():
+def test_memoized_encrypted_private_bytes():
     keypair = SnowflakeKeypair.generate()
-    assert keypair.private_bytes != keypair.private_bytes
+    assert keypair.private_bytes is keypair.private_bytes
+    assert keypair.private_str == keypair.private_str
+
+
+def test_with_password_invalidates_memoized_private_bytes():
+    keypair0 = SnowflakeKeypair.generate()
+    keypair1 = keypair0.with_password(keypair0.private_key_pwd)
+    assert keypair0 == keypair1 and keypair0.private_bytes != keypair1.private_bytes
+    keypair2 = SnowflakeKeypair.from_bytes(
+        keypair1.private_bytes, keypair1.private_key_pwd
+    )
+    assert keypair1 == keypair2
 
 
 def test_varying_encrypted_private_bytes_but_same_private_numbers():
@@ -144,3 +155,47 @@ def test_oneline_env_path(encrypted, tmp_path):
         kp.private_key_pwd
     )
     assert kp == other
+
+
+def test_generate_many():
+    passwords = ("password0", "password1", None)
+    keypairs = tuple(
+        SnowflakeKeypair.generate_many(len(passwords), workers=2, passwords=passwords)
+    )
+    assert len(keypairs) == len(passwords)
+    assert len(set(kp.private_key.private_numbers().d for kp in keypairs)) == 3
+    assert {"password0", "password1"} < set(kp.private_key_pwd for kp in keypairs)
+    assert all(kp.private_key_pwd is not None for kp in keypairs)
+
+
+def test_generate_many_stops_early():
+    # with everything submitted up front, closing would wait for all 1000 keys
+    keypairs = SnowflakeKeypair.generate_many(1000, workers=1)
+    assert isinstance(next(keypairs), SnowflakeKeypair)
+    keypairs.close()
+
+
+def test_generate_many_wrong_number_of_passwords():
+    with pytest.raises(ValueError, match="expected 2 passwords"):
+        tuple(SnowflakeKeypair.generate_many(2, passwords=("password0",)))
+
+
+def test_hash():
+    keypair0 = SnowflakeKeypair.generate()
+    keypair1 = SnowflakeKeypair(keypair0.private_key, keypair0.private_key_pwd)
+    keypair2 = SnowflakeKeypair.generate()
+    assert hash(keypair0) == hash(keypair1)
+    assert len({keypair0, keypair1, keypair2}) == 2
+    assert {keypair0: 0}[keypair1] == 0
+
+
+def test_public_key_fingerprint():
+    from snowflake_keypair_helper.jwt_generator import JWTGenerator
+
+    keypair = SnowflakeKeypair.generate()
+    assert keypair.public_key_fingerprint.startswith("SHA256:")
+    assert keypair.public_key_fingerprint is keypair.public_key_fingerprint
+    assert keypair.public_key_fingerprint == (
+        JWTGenerator.calculate_public_key_fingerprint(keypair.private_key)
+    )
+    assert keypair != keypair.public_key_fingerprint
@@ -0,0 +1,159 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Callable,
+    Optional,
+)
+
+from attr import (
+    define,
+    field,
+)
+from attr.validators import (
+    ge,
+    instance_of,
+    optional,
+)
+
+
+_missing = object()
+
+
+def make_digest(*parts):
+    # length-prefix every part so that ("ab", "c") and ("a", "bc") don't collide
+    hasher = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            hasher.update(b"\x00")
+        else:
+            part = part.encode("utf-8") if isinstance(part, str) else bytes(part)
+            hasher.update(b"\x01" + len(part).to_bytes(8, "big") + part)
+    return hasher.digest()
+
+
+@define
+class TTLLRUCache:
+    """
+    A thread-safe mapping with a bounded size and an optional time-to-live. The least recently used entry is evicted
+    when maxsize is exceeded and entries older than ttl seconds are treated as absent. With touch, a hit restarts the
+    entry's ttl, which makes ttl an idle timeout. on_evict is called with (key, value) for every evicted entry.
+    """
+
+    maxsize: int = field(default=128, validator=[instance_of(int), ge(1)])
+    ttl: Optional[float] = field(
+        default=None, validator=optional(instance_of((int, float)))
+    )
+    touch: bool = field(default=False, validator=instance_of(bool))
+    on_evict: Optional[Callable] = field(default=None, repr=False)
+    clock: Callable = field(default=time.monotonic, repr=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    _data: OrderedDict = field(factory=OrderedDict, init=False, repr=False)
+    _lock: threading.RLock = field(factory=threading.RLock, init=False, repr=False)
+    # key -> threading.Event set once the get_or_set computing it is done
+    _in_flight: dict = field(factory=dict, init=False, repr=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # a pure read: membership changes neither recency nor ttl
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not self._is_expired(entry[0])
+
+    def _is_expired(self, expires_at):
+        return expires_at is not None and expires_at <= self.clock()
+
+    def _make_expires_at(self):
+        return None if self.ttl is None else self.clock() + self.ttl
+
+    def _notify_evicted(self, evicted):
+        # called without holding the lock: callbacks may be slow
+        if self.on_evict is not None:
+            for key, value in evicted:
+                self.on_evict(key, value)
+
+    def get(self, key, default=None, count=True):
+        evicted = ()
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                pass
+            else:
+                if not self._is_expired(expires_at):
+                    self._data.move_to_end(key)
+                    if self.touch:
+                        self._data[key] = (self._make_expires_at(), value)
+                    if count:
+                        self.hits += 1
+                    return value
+                del self._data[key]
+                self.evictions += 1
+                evicted = ((key, value),)
+            if count:
+                self.misses += 1
+        self._notify_evicted(evicted)
+        return default
+
+    def set(self, key, value):
+        evicted = ()
+        with self._lock:
+            self._data[key] = (self._make_expires_at(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                (evicted_key, (_, evicted_value)) = self._data.popitem(last=False)
+                evicted += ((evicted_key, evicted_value),)
+                self.evictions += 1
+        self._notify_evicted(evicted)
+        return value
+
+    def evict_expired(self):
+        # entries are in recency order: with touch that is also expiry order
+        evicted = ()
+        with self._lock:
+            while self._data:
+                (key, (expires_at, value)) = next(iter(self._data.items()))
+                if not self._is_expired(expires_at):
+                    break
+                del self._data[key]
+                evicted += ((key, value),)
+                self.evictions += 1
+        self._notify_evicted(evicted)
+        return len(evicted)
+
+    def get_or_set(self, key, f):
+        # f is called outside the lock, once per key at a time: concurrent misses wait for it
+        # if f raises, the next waiter calls f itself
+        while (value := self.get(key, _missing)) is _missing:
+            with self._lock:
+                if (event := self._in_flight.get(key)) is None:
+                    if key in self._data:
+                        # set since our miss
+                        continue
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            event.wait()
+        else:
+            return value
+        try:
+            return self.set(key, f())
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            _, value = self._data.pop(key, (None, default))
+            return value
+
+    def clear(self):
+        with self._lock:
+            evicted = tuple((key, value) for key, (_, value) in self._data.items())
+            self._data.clear()
+        self._notify_evicted(evicted)
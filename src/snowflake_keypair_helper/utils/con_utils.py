@@ -1,7 +1,32 @@
 import functools
 import os
+import re
+import threading
+import time
+import weakref
+from collections import (
+    ChainMap,
+    deque,
+)
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import (
+    Callable,
+    Optional,
+)
 
 import toolz
+from attr import (
+    define,
+    field,
+)
+from attr.validators import (
+    ge,
+    instance_of,
+    optional,
+)
 
 from snowflake_keypair_helper.constants import (
     default_database,
@@ -15,7 +40,7 @@ from snowflake_keypair_helper.enums import (
     SnowflakeFields,
 )
 from snowflake_keypair_helper.utils.env_utils import (
-    with_env_path,
+    parse_env_path_cached,
 )
 from snowflake_keypair_helper.utils.general_utils import (
     ensure_header_footer,
@@ -26,11 +51,25 @@ def make_env_name(name, prefix=snowflake_env_var_prefix):
     return f"{prefix}{name.upper()}"
 
 
-def get_env_vars(*names, prefix=""):
+def get_connection_names(ctx=os.environ):
+    # connection names are found from any known field: SNOWFLAKE_CONNECTIONS_<name>_<field>
+    before, after = snowflake_connection_name_formatter.split("{connection_name}")
+    fields = "|".join(
+        re.escape(name.upper())
+        for name in sorted((*SnowflakeFields, "public_key"), key=len, reverse=True)
+    )
+    compiled_re = re.compile(
+        f"{re.escape(before)}(?P<connection_name>.+?){re.escape(after)}(?:{fields})$"
+    )
+    matches = filter(None, map(compiled_re.match, ctx))
+    return tuple(sorted({match["connection_name"] for match in matches}))
+
+
+def get_env_vars(*names, prefix="", ctx=os.environ):
     env_vars = {
         name: value
         for name, value in (
-            (name, os.environ.get(make_env_name(name, prefix=prefix))) for name in names
+            (name, ctx.get(make_env_name(name, prefix=prefix))) for name in names
         )
         if value is not None
     }
@@ -38,7 +77,9 @@ def get_env_vars(*names, prefix=""):
 
 
 def get_authenticator_credentials(
-    authenticator=SnowflakeAuthenticator.keypair, prefix=snowflake_env_var_prefix
+    authenticator=SnowflakeAuthenticator.keypair,
+    prefix=snowflake_env_var_prefix,
+    ctx=os.environ,
 ):
     match str(authenticator).lower():
         case (
@@ -48,7 +89,7 @@ def get_authenticator_credentials(
             | SnowflakeAuthenticator.sso
         ):
             fields = SnowflakeEnvFields[authenticator.name]
-            dct = get_env_vars(*fields.value, prefix=prefix)
+            dct = get_env_vars(*fields.value, prefix=prefix, ctx=ctx)
             return dct
         case _:
             raise ValueError(f"Unknown authenticator: {authenticator}")
@@ -59,6 +100,11 @@ get_connection_defaults = toolz.curry(
 )
 
 
+def get_env_path_ctx(env_path=os.devnull):
+    # same precedence as with_env_path: the env file wins over os.environ
+    return ChainMap(parse_env_path_cached(env_path), os.environ)
+
+
 def maybe_process_keypair(kwargs):
     match kwargs:
         case {
@@ -91,6 +137,50 @@ def maybe_process_keypair(kwargs):
     return kwargs
 
 
+def arbitrate_prefix(prefix, connection_name):
+    match (prefix, connection_name):
+        case (None, None):
+            return snowflake_env_var_prefix
+        case (None, connection_name):
+            return snowflake_connection_name_formatter.format(
+                connection_name=connection_name
+            )
+        case (prefix, None):
+            return prefix
+        case (_, _):
+            raise ValueError("must pass no more than one of prefix, connection_name")
+    raise ValueError
+
+
+def resolve_connect_env_kwargs(
+    passcode=None,
+    authenticator=SnowflakeAuthenticator.keypair,
+    env_path=os.devnull,
+    prefix=None,
+    connection_name=None,
+    **overrides,
+):
+    from snowflake_keypair_helper.utils.crypto_utils import (
+        maybe_decrypt_private_key_snowflake,
+    )
+
+    prefix = arbitrate_prefix(prefix, connection_name)
+    # resolve from the env file layered over os.environ: never mutate os.environ
+    ctx = get_env_path_ctx(env_path)
+    kwargs = (
+        get_connection_defaults(prefix=prefix, ctx=ctx)
+        | get_authenticator_credentials(authenticator, prefix=prefix, ctx=ctx)
+        | {
+            SnowflakeFields.passcode: passcode,
+            SnowflakeFields.authenticator: authenticator,
+        }
+        | overrides
+    )
+    kwargs = maybe_process_keypair(kwargs)
+    kwargs = maybe_decrypt_private_key_snowflake(kwargs)
+    return kwargs
+
+
 def connect_env(
     passcode=None,
     database=default_database,
@@ -105,39 +195,14 @@ def connect_env(
         connect,
     )
 
-    from snowflake_keypair_helper.utils.crypto_utils import (
-        maybe_decrypt_private_key_snowflake,
+    kwargs = resolve_connect_env_kwargs(
+        passcode=passcode,
+        authenticator=authenticator,
+        env_path=env_path,
+        prefix=prefix,
+        connection_name=connection_name,
+        **overrides,
     )
-
-    def arbitrate_prefix(prefix, connection_name):
-        match (prefix, connection_name):
-            case (None, None):
-                return snowflake_env_var_prefix
-            case (None, connection_name):
-                return snowflake_connection_name_formatter.format(
-                    connection_name=connection_name
-                )
-            case (prefix, None):
-                return prefix
-            case (_, _):
-                raise ValueError(
-                    "must pass no more than one of prefix, connection_name"
-                )
-        raise ValueError
-
-    prefix = arbitrate_prefix(prefix, connection_name)
-    with with_env_path(env_path):
-        kwargs = (
-            get_connection_defaults(prefix=prefix)
-            | get_authenticator_credentials(authenticator, prefix=prefix)
-            | {
-                SnowflakeFields.passcode: passcode,
-                SnowflakeFields.authenticator: authenticator,
-            }
-            | overrides
-        )
-    kwargs = maybe_process_keypair(kwargs)
-    kwargs = maybe_decrypt_private_key_snowflake(kwargs)
     con = connect(database=database, schema=schema, **kwargs)
     return con
 
@@ -153,6 +218,210 @@ connect_env_keypair = functools.partial(
 )
 
 
+def connect_many(
+    connection_names=None,
+    env_path=os.devnull,
+    max_workers=8,
+    close=True,
+    connect=connect_env,
+    **kwargs,
+):
+    """
+    Connect to many connection profiles concurrently, at most max_workers logins at a time.
+    :param connection_names: defaults to every SNOWFLAKE_CONNECTIONS_<name>_ profile in env_path and os.environ
+    :param close: close each connection once it has been made
+    :return: one dict per connection name, in order: connection_name, success, seconds, error and con (None on
+        failure)
+    """
+    if connection_names is None:
+        connection_names = get_connection_names(get_env_path_ctx(env_path))
+
+    def connect_one(connection_name):
+        start = time.perf_counter()
+        try:
+            con = connect(connection_name=connection_name, env_path=env_path, **kwargs)
+            error = None
+        except Exception as e:
+            (con, error) = (None, e)
+        seconds = time.perf_counter() - start
+        if close and con is not None:
+            con.close()
+        return {
+            "connection_name": connection_name,
+            "success": error is None,
+            "seconds": seconds,
+            "error": error,
+            "con": con,
+        }
+
+    if not connection_names:
+        return ()
+    # logins are network bound: threads overlap them
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return tuple(executor.map(connect_one, connection_names))
+
+
+def freeze_connection_param(value):
+    # a hashable stand-in for value: overrides such as session_parameters are dicts
+    match value:
+        case dict():
+            items = ((key, freeze_connection_param(el)) for key, el in value.items())
+            return (dict, tuple(sorted(items)))
+        case list() | tuple():
+            return (type(value), tuple(map(freeze_connection_param, value)))
+        case set() | frozenset():
+            return frozenset(map(freeze_connection_param, value))
+    try:
+        hash(value)
+    except TypeError as e:
+        raise ValueError(f"cannot make a connection key with {value!r}") from e
+    return value
+
+
+def make_connection_key(
+    database=default_database,
+    schema=default_schema,
+    authenticator=SnowflakeAuthenticator.keypair,
+    env_path=os.devnull,
+    prefix=None,
+    connection_name=None,
+    passcode=None,
+    **overrides,
+):
+    # what identifies a connect_env connection: resolved without decrypting any key
+    prefix = arbitrate_prefix(prefix, connection_name)
+    ctx = get_env_path_ctx(env_path)
+    params = (
+        get_connection_defaults(prefix=prefix, ctx=ctx)
+        | get_env_vars(SnowflakeFields.user, prefix=prefix, ctx=ctx)
+        | {
+            SnowflakeFields.database: database,
+            SnowflakeFields.schema: schema,
+            SnowflakeFields.authenticator: str(authenticator),
+        }
+        | overrides
+    )
+    return (prefix, str(Path(env_path).absolute()), freeze_connection_param(params))
+
+
+def is_connection_healthy(con):
+    return not con.is_closed()
+
+
+@define
+class ConnectionPool:
+    """
+    Keeps connect_env connections open for reuse, keyed by their resolved parameters (prefix or connection_name, env
+    file, user, role, warehouse, database, schema, ...). Borrowing an idle connection skips credential resolution, key
+    decryption and login. At most max_size idle connections are kept per key; connections idle for longer than
+    idle_timeout, or failing health_check when borrowed, are closed.
+    """
+
+    max_size: int = field(default=8, validator=[instance_of(int), ge(0)])
+    idle_timeout: Optional[timedelta] = field(
+        default=timedelta(minutes=10), validator=optional(instance_of(timedelta))
+    )
+    health_check: Callable = field(default=is_connection_healthy, repr=False)
+    connect: Callable = field(default=connect_env, repr=False)
+    clock: Callable = field(default=time.monotonic, repr=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    # key -> deque of (released_at, connection), most recently released last
+    _idle: dict = field(factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(factory=threading.Lock, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    def __len__(self):
+        return sum(map(len, self._idle.values()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _is_idle_expired(self, released_at):
+        return (
+            self.idle_timeout is not None
+            and self.clock() - released_at >= self.idle_timeout.total_seconds()
+        )
+
+    @staticmethod
+    def _close_all(cons):
+        # closing may hit the network: never under the lock
+        for con in cons:
+            con.close()
+
+    def _borrow(self, key):
+        expired = []
+        try:
+            while True:
+                with self._lock:
+                    idle = self._idle.get(key)
+                    if not idle:
+                        return None
+                    (released_at, con) = idle.pop()
+                    # the rest of the deque was released even earlier
+                    if self._is_idle_expired(released_at):
+                        expired += (con, *(con for _, con in idle))
+                        idle.clear()
+                        return None
+                if self.health_check(con):
+                    return con
+                expired.append(con)
+        finally:
+            self._close_all(expired)
+
+    def _release(self, key, con):
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if self._closed or len(idle) >= self.max_size:
+                to_close = (con,)
+            else:
+                idle.append((self.clock(), con))
+                to_close = ()
+        self._close_all(to_close)
+
+    @contextmanager
+    def acquire(self, **kwargs):
+        """
+        Borrow a connection for connect_env(**kwargs), connecting only when no healthy idle connection exists. The
+        connection goes back to the pool on exit.
+        """
+        if self._closed:
+            raise ValueError("ConnectionPool is closed")
+        key = make_connection_key(**kwargs)
+        con = self._borrow(key)
+        with self._lock:
+            self.hits += con is not None
+            self.misses += con is None
+        if con is None:
+            con = self.connect(**kwargs)
+        try:
+            yield con
+        finally:
+            self._release(key, con)
+
+    def evict_idle(self):
+        expired = []
+        with self._lock:
+            for idle in self._idle.values():
+                # oldest first
+                while idle and self._is_idle_expired(idle[0][0]):
+                    expired.append(idle.popleft()[1])
+        self._close_all(expired)
+        return len(expired)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            (cons, self._idle) = (
+                [con for idle in self._idle.values() for _, con in idle],
+                {},
+            )
+        self._close_all(cons)
+
+
 def con_to_adbc_kwargs(
     con, database=default_database, schema=default_schema, **uri_overrides
 ):
@@ -207,27 +476,101 @@ def con_to_adbc_kwargs(
     return kwargs
 
 
-def con_to_adbc_con(con):
-    import adbc_driver_snowflake.dbapi as dbapi
+@define
+class AdbcHandle:
+    """
+    The ADBC side of one SnowflakeConnection: a root dbapi connection that is logged in once and reused. Work on the
+    root is serialized by a lock; connections cloned from the root share its database, so they skip key encryption and
+    driver setup, but each one is a new session.
+    """
+
+    root = field(repr=False)
+    _lock: threading.Lock = field(factory=threading.Lock, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    @property
+    def is_closed(self):
+        return self._closed
+
+    @contextmanager
+    def connection(self):
+        # the root itself, one user at a time
+        with self._lock:
+            if self._closed:
+                raise ValueError("the ADBC handle is closed")
+            yield self.root
+
+    def clone(self):
+        return self.root.adbc_clone()
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self.root.close()
+
+    @classmethod
+    def from_con(cls, con):
+        import adbc_driver_snowflake.dbapi as dbapi
+
+        return cls(dbapi.connect(**con_to_adbc_kwargs(con)))
+
+
+# SnowflakeConnection -> AdbcHandle: dropped (and closed) along with the connection
+adbc_handles = weakref.WeakKeyDictionary()
+adbc_handles_lock = threading.Lock()
+
+
+def get_adbc_handle(con):
+    with adbc_handles_lock:
+        handle = adbc_handles.get(con)
+    if handle is not None and not handle.is_closed:
+        return handle
+    # log in without holding the lock: other connections' handles stay available meanwhile
+    new_handle = AdbcHandle.from_con(con)
+    with adbc_handles_lock:
+        handle = adbc_handles.get(con)
+        if is_new := handle is None or handle.is_closed:
+            handle = adbc_handles[con] = new_handle
+            weakref.finalize(con, handle.close)
+    if not is_new:
+        # another thread got there first
+        new_handle.close()
+    return handle
+
+
+def close_adbc_handle(con):
+    with adbc_handles_lock:
+        handle = adbc_handles.pop(con, None)
+    if handle is not None:
+        handle.close()
 
-    adbc_kwargs = con_to_adbc_kwargs(con)
-    return dbapi.connect(**adbc_kwargs)
+
+def con_to_adbc_con(con):
+    # a new session on con's cached ADBC database, for concurrent work: closing it leaves the database open
+    return get_adbc_handle(con).clone()
 
 
 def adbc_ingest(
     con, table_name, record_batch_reader, mode="create", temporary=False, **kwargs
 ):
-    with con_to_adbc_con(con) as conn:
-        with conn.cursor() as cur:
-            cur.adbc_ingest(
-                table_name,
-                record_batch_reader,
-                mode=mode,
-                temporary=temporary,
-                **kwargs,
-            )
-        # must commit!
-        conn.commit()
+    # repeat ingests reuse con's logged-in root connection: only the cursor is new
+    with get_adbc_handle(con).connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.adbc_ingest(
+                    table_name,
+                    record_batch_reader,
+                    mode=mode,
+                    temporary=temporary,
+                    **kwargs,
+                )
+            # must commit!
+            conn.commit()
+        except BaseException:
+            # leave nothing behind for the next ingest on the root
+            conn.rollback()
+            raise
 
 
 @toolz.curry
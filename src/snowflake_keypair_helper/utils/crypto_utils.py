@@ -8,6 +8,10 @@ from snowflake_keypair_helper.enums import (
 from snowflake_keypair_helper.snowflake_keypair import (
     SnowflakeKeypair,
 )
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+    make_digest,
+)
 from snowflake_keypair_helper.utils.general_utils import (
     encode_utf8,
     make_private_key_pwd,
@@ -21,6 +25,22 @@ def decrypt_private_bytes_snowflake(private_bytes: bytes, password_str: str):
     ).get_private_bytes(encoding=Encoding.DER, encrypted=False)
 
 
+# process-local: maps digest(encrypted PEM, password) to unencrypted DER
+decrypted_private_key_cache = TTLLRUCache(maxsize=128, ttl=15 * 60)
+
+
+def decrypt_private_bytes_snowflake_cached(
+    private_bytes: bytes, password_str: str, cache=decrypted_private_key_cache
+):
+    def decrypt():
+        private_bytes_der = decrypt_private_bytes_snowflake(private_bytes, password_str)
+        # validate once: cache hits skip the KDF and both parses
+        SnowflakeKeypair.from_bytes_der(private_bytes_der)
+        return private_bytes_der
+
+    return cache.get_or_set(make_digest(private_bytes, password_str), decrypt)
+
+
 def encrypt_private_bytes_snowflake_adbc(private_bytes: bytes, password_str: str):
     # unencrypted DER to encrypted PEM: for adbc_driver_snowflake.dbapi.connect
     return (
@@ -42,14 +62,15 @@ def maybe_decrypt_private_key_snowflake(kwargs: dict):
         }:
             assert isinstance(private_key, str)
             kwargs = rest | {
-                SnowflakeFields.private_key: decrypt_private_bytes_snowflake(
+                SnowflakeFields.private_key: decrypt_private_bytes_snowflake_cached(
                     encode_utf8(private_key), private_key_pwd
                 )
             }
         case {SnowflakeFields.private_key: private_key, **rest}:
             match private_key:
                 case bytes():
-                    pass
+                    # ctor will fail if other than unencrypted DER format (bytes)
+                    SnowflakeKeypair.from_bytes_der(private_key)
                 case str():
                     kwargs = rest | {
                         SnowflakeFields.private_key: SnowflakeKeypair.from_str_pem(
@@ -64,8 +85,6 @@ def maybe_decrypt_private_key_snowflake(kwargs: dict):
             raise ValueError(
                 f"`{SnowflakeFields.private_key}` not found in kwargs: {tuple(kwargs)}"
             )
-    # ctor will fail if other than unencrypted DER format (bytes)
-    SnowflakeKeypair.from_bytes_der(kwargs[SnowflakeFields.private_key])
     return kwargs
 
 
@@ -89,8 +108,13 @@ def maybe_encrypt_private_key_snowflake_adbc(
     return (private_key_encrypted, private_key_pwd)
 
 
-def generate_private_str(password=None):
+def generate_private_str(password=None, pool=None):
     # # equivalent to https://docs.snowflake.com/en/user-guide/key-pair-auth#generate-the-private-keys
     # maybe_passout_arg = f"-passout 'pass:{password}'" if password else "-nocrypt"
     # f"openssl genrsa 2048 | openssl pkcs8 -topk8 -inform PEM -out - {maybe_passout_arg}"
-    return SnowflakeKeypair.generate(password=password).private_str
+    keypair = (
+        SnowflakeKeypair.generate(password=password)
+        if pool is None
+        else pool.acquire(password=password)
+    )
+    return keypair.private_str
@@ -1,10 +1,15 @@
 import contextlib
+import functools
 import itertools
 import os
 import re
 import shlex
 from pathlib import Path
 
+from snowflake_keypair_helper.utils.cache_utils import (
+    TTLLRUCache,
+)
+
 
 compiled_env_var_setting_re = re.compile(
     "(?:export )?([^=]+)=(.*)",
@@ -12,7 +17,95 @@ compiled_env_var_setting_re = re.compile(
 )
 
 
+# one alternative per lexical element of a posix shell line, as understood by shlex
+compiled_env_token_re = re.compile(
+    r"""
+    (?P<newline>\n)
+    |(?P<space>[\ \t\r]+)
+    |(?P<comment>\#[^\n]*\n?)
+    |'(?P<single>[^']*)'
+    |"(?P<double>(?:[^"\\]|\\.)*)"
+    |\\(?P<escape>.)
+    |(?P<word>[^\ \t\r\n'"\\\#]+)
+    |(?P<unterminated>['"\\])
+    """,
+    flags=re.VERBOSE | re.DOTALL,
+)
+# inside double quotes, shlex only treats backslash as an escape before " or \
+compiled_double_quote_escape_re = re.compile(r'\\(["\\])')
+
+
+def gen_env_token_lines(text, final=False, compiled_re=compiled_env_token_re):
+    # yields (end, tokens) per logical line, grouped the way parse_env_path_shlex groups them: a line ends with the
+    # first token whose read consumed a newline, counting the whitespace and comments before it and its terminator
+    # so "A=1 \nB=2" is one line and "# c\nA=1 B=2" is two
+    # stops at the first unterminated quote or comment: text[end:] must be retried with more input, unless final
+    (tokens, word, newline) = ((), None, False)
+    for match in compiled_re.finditer(text):
+        kind = match.lastgroup
+        if kind == "unterminated":
+            return
+        if kind == "comment" and not final and not match.group().endswith("\n"):
+            return
+        if kind in ("newline", "space", "comment"):
+            newline = newline or kind != "space"
+            if word is not None:
+                (tokens, word) = (tokens + (word,), None)
+                if newline:
+                    yield (match.end(), tokens)
+                    (tokens, newline) = ((), False)
+            continue
+        newline = newline or "\n" in match.group()
+        value = match.group(kind)
+        if kind == "double":
+            value = compiled_double_quote_escape_re.sub(r"\1", value)
+        word = value if word is None else word + value
+    if final:
+        yield (len(text), tokens if word is None else tokens + (word,))
+
+
+def gen_env_items(chunks, compiled_re=compiled_env_var_setting_re):
+    buffer = ""
+    # None marks the end of input: whatever tokens are pending form the last line
+    for chunk in itertools.chain(chunks, (None,)):
+        buffer += chunk or ""
+        consumed = 0
+        for consumed, tokens in gen_env_token_lines(buffer, final=chunk is None):
+            if tokens and (match := compiled_re.match(" ".join(tokens))):
+                yield match.groups()
+        buffer = buffer[consumed:]
+    if buffer.strip():
+        raise ValueError("No closing quotation")
+
+
+def parse_env_text(text, compiled_re=compiled_env_var_setting_re):
+    return dict(gen_env_items((text,), compiled_re=compiled_re))
+
+
+def iter_env_path(env_path, compiled_re=compiled_env_var_setting_re, chunk_size=2**16):
+    # streaming variant of parse_env_path: reads chunk_size characters at a time
+    with Path(env_path).open() as fh:
+        chunks = iter(functools.partial(fh.read, chunk_size), "")
+        yield from gen_env_items(chunks, compiled_re=compiled_re)
+
+
 def parse_env_path(env_path, compiled_re=compiled_env_var_setting_re):
+    return parse_env_text(Path(env_path).read_text(), compiled_re=compiled_re)
+
+
+# maps (path, mtime, size) to the parsed dict: a changed file gets a new key
+parsed_env_path_cache = TTLLRUCache(maxsize=64)
+
+
+def parse_env_path_cached(env_path, cache=parsed_env_path_cache):
+    stat = os.stat(env_path)
+    key = (os.path.abspath(env_path), stat.st_mtime_ns, stat.st_size)
+    dct = cache.get_or_set(key, functools.partial(parse_env_path, env_path))
+    # callers may mutate what they get
+    return dict(dct)
+
+
+def parse_env_path_shlex(env_path, compiled_re=compiled_env_var_setting_re):
     def gen_shlex_lines(path):
         def make_lexer(path):
             lex = shlex.shlex(Path(path).read_text(), posix=True)
@@ -56,6 +149,6 @@ def with_environ(dct, clear=False):
 
 @contextlib.contextmanager
 def with_env_path(env_path, clear=False):
-    dct = parse_env_path(env_path)
+    dct = parse_env_path_cached(env_path)
     with with_environ(dct, clear=clear):
         yield
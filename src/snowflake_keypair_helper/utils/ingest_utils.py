@@ -0,0 +1,320 @@
+import itertools
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Optional,
+)
+
+from attr import (
+    define,
+    field,
+)
+from attr.validators import (
+    ge,
+    instance_of,
+    optional,
+)
+
+from snowflake_keypair_helper.utils.con_utils import (
+    con_to_adbc_con,
+)
+
+
+# put on the queue by close: the writer flushes what it has and exits
+_close = object()
+
+
+class _Stopped(Exception):
+    # raised in a parallel_ingest worker because another worker failed: the driver may wrap it in its own error
+    pass
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def qualify_table_name(table_name, catalog_name=None, db_schema_name=None):
+    # quoted and qualified the way the ADBC driver names an ingest target: names are case sensitive
+    names = (catalog_name, db_schema_name, table_name)
+    return ".".join(quote_identifier(name) for name in names if name is not None)
+
+
+def gen_record_batches(data):
+    # data is a RecordBatch, a Table, a Dataset or any iterable of RecordBatches (e.g. a RecordBatchReader)
+    import pyarrow as pa
+
+    if isinstance(data, pa.RecordBatch):
+        yield data
+    elif hasattr(data, "to_batches"):
+        yield from data.to_batches()
+    else:
+        yield from data
+
+
+@define
+class IngestWriter:
+    """
+    Streams record batches into table_name over one ADBC connection that stays open until close. write puts batches
+    on a bounded queue, blocking while it is full, and a background thread ingests whatever has been buffered once
+    max_rows, max_bytes or max_seconds is reached. The first flush uses mode, later flushes append. Commits happen once,
+    on a clean close, or after every flush with commit_per_flush. An error in the writer thread is raised by the next
+    write or by close.
+    """
+
+    con = field(repr=False)
+    table_name: str = field(validator=instance_of(str))
+    mode: str = field(default="create", validator=instance_of(str))
+    temporary: bool = field(default=False, validator=instance_of(bool))
+    max_rows: int = field(default=1_000_000, validator=[instance_of(int), ge(1)])
+    max_bytes: int = field(default=64 * 2**20, validator=[instance_of(int), ge(1)])
+    max_seconds: Optional[float] = field(
+        default=10.0, validator=optional(instance_of((int, float)))
+    )
+    max_queue: int = field(default=8, validator=[instance_of(int), ge(1)])
+    commit_per_flush: bool = field(default=False, validator=instance_of(bool))
+    # passed to every cursor.adbc_ingest
+    ingest_kwargs: dict = field(factory=dict, repr=False)
+    connect: Callable = field(default=con_to_adbc_con, repr=False)
+    rows_written: int = field(default=0, init=False)
+    bytes_written: int = field(default=0, init=False)
+    flushes: int = field(default=0, init=False)
+    _queue: queue.Queue = field(init=False, repr=False)
+    _adbc_con = field(default=None, init=False, repr=False)
+    _thread: threading.Thread = field(default=None, init=False, repr=False)
+    _error: BaseException = field(default=None, init=False, repr=False)
+
+    @_queue.default
+    def _queue_default(self):
+        return queue.Queue(maxsize=self.max_queue)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(commit=exc_type is None)
+
+    def start(self):
+        if self._thread is None:
+            self._adbc_con = self.connect(self.con)
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"{type(self).__name__}-{self.table_name}",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, data):
+        if self._thread is None:
+            raise ValueError("IngestWriter is not started")
+        for batch in gen_record_batches(data):
+            self._raise_error()
+            # blocks while the queue is full: backpressure on the producer
+            self._queue.put(batch)
+
+    def _flush(self, batches):
+        import pyarrow as pa
+
+        reader = pa.RecordBatchReader.from_batches(batches[0].schema, batches)
+        with self._adbc_con.cursor() as cur:
+            cur.adbc_ingest(
+                self.table_name,
+                reader,
+                mode=self.mode if not self.flushes else "append",
+                temporary=self.temporary,
+                **self.ingest_kwargs,
+            )
+        if self.commit_per_flush:
+            self._adbc_con.commit()
+        self.rows_written += sum(batch.num_rows for batch in batches)
+        self.bytes_written += sum(batch.nbytes for batch in batches)
+        self.flushes += 1
+
+    def _run(self):
+        (batches, rows, nbytes, deadline) = ([], 0, 0, None)
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _close and self._error is None:
+                batches.append(item)
+                rows += item.num_rows
+                nbytes += item.nbytes
+                if deadline is None and self.max_seconds is not None:
+                    deadline = time.monotonic() + self.max_seconds
+            is_due = (
+                rows >= self.max_rows
+                or nbytes >= self.max_bytes
+                or (deadline is not None and time.monotonic() >= deadline)
+                or item is _close
+            )
+            if batches and is_due and self._error is None:
+                try:
+                    self._flush(batches)
+                except BaseException as e:
+                    # keep draining so that blocked writers wake up and see the error
+                    self._error = e
+                (batches, rows, nbytes, deadline) = ([], 0, 0, None)
+            if item is _close:
+                return
+
+    def close(self, commit=True):
+        if self._thread is None:
+            return
+        self._queue.put(_close)
+        self._thread.join()
+        self._thread = None
+        try:
+            if commit and self._error is None:
+                if not self.commit_per_flush:
+                    self._adbc_con.commit()
+            else:
+                self._adbc_con.rollback()
+            self._raise_error()
+        finally:
+            self._adbc_con.close()
+            self._adbc_con = None
+
+
+def parallel_ingest(
+    con,
+    table_name,
+    data,
+    workers=4,
+    mode="create_append",
+    staging=False,
+    max_queue=None,
+    connect=con_to_adbc_con,
+    **ingest_kwargs,
+):
+    """
+    Ingest data into table_name over workers ADBC connections cloned from con's cached ADBC database. Batches are
+    handed out through a shared bounded queue, so a fast worker takes more of them. table_name is created (per mode)
+    before the workers start. Each worker then appends to table_name directly or, with staging, loads its own staging
+    table; the staging tables are merged into table_name with a single INSERT INTO ... SELECT once every worker has
+    committed, and are always dropped. The merge and the drops run over an ADBC connection too, with the names quoted
+    and qualified (by catalog_name and db_schema_name in ingest_kwargs) like the ingest targets. Without staging each
+    worker commits on its own: a failure leaves the batches that other workers committed in table_name.
+    :param data: a RecordBatchReader, a Table, a Dataset or any iterable of RecordBatches
+    :return: one dict per worker: worker, table_name, rows, bytes, seconds and rows_per_second
+    """
+    import pyarrow as pa
+
+    batches = iter(gen_record_batches(data))
+    if (first := next(batches, None)) is None:
+        return ()
+    schema = first.schema
+    batch_queue = queue.Queue(maxsize=max_queue or 2 * workers)
+    stop = threading.Event()
+    # the first error, recorded before stop is set: the errors of the workers it stopped are not
+    (first_error, first_error_lock) = ([], threading.Lock())
+    token = secrets.token_hex(4).upper()
+    worker_table_names = tuple(
+        f"{table_name}_SKH_STAGE_{token}_{worker}" if staging else table_name
+        for worker in range(workers)
+    )
+
+    @contextmanager
+    def cursor():
+        # committed on a clean exit
+        adbc_con = connect(con)
+        try:
+            with adbc_con.cursor() as cur:
+                yield cur
+            adbc_con.commit()
+        finally:
+            adbc_con.close()
+
+    def fail(error):
+        with first_error_lock:
+            if not first_error:
+                first_error.append(error)
+            stop.set()
+
+    def qualify(name):
+        return qualify_table_name(
+            name,
+            catalog_name=ingest_kwargs.get("catalog_name"),
+            db_schema_name=ingest_kwargs.get("db_schema_name"),
+        )
+
+    def ingest(table_name, reader, mode):
+        with cursor() as cur:
+            cur.adbc_ingest(table_name, reader, mode=mode, **ingest_kwargs)
+
+    def gen_queued(stats):
+        while True:
+            try:
+                batch = batch_queue.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    raise _Stopped()
+                continue
+            if batch is _close:
+                return
+            stats["rows"] += batch.num_rows
+            stats["bytes"] += batch.nbytes
+            yield batch
+
+    def work(worker):
+        stats = {"worker": worker, "table_name": worker_table_names[worker]}
+        stats |= {"rows": 0, "bytes": 0}
+        start = time.perf_counter()
+        try:
+            reader = pa.RecordBatchReader.from_batches(schema, gen_queued(stats))
+            ingest(stats["table_name"], reader, "create" if staging else "append")
+        except BaseException as e:
+            fail(e)
+            raise
+        stats["seconds"] = seconds = time.perf_counter() - start
+        stats["rows_per_second"] = stats["rows"] / seconds if seconds else None
+        return stats
+
+    def put(item):
+        # never block on a queue that failed workers no longer drain
+        while not stop.is_set():
+            try:
+                return batch_queue.put(item, timeout=0.1)
+            except queue.Full:
+                pass
+
+    ingest(table_name, pa.RecordBatchReader.from_batches(schema, ()), mode)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = tuple(map(executor.submit, (work,) * workers, range(workers)))
+            try:
+                for batch in itertools.chain((first,), batches):
+                    if stop.is_set():
+                        break
+                    put(batch)
+                for _ in range(workers):
+                    put(_close)
+            except BaseException as e:
+                fail(e)
+                raise
+        # raise what failed first, not the workers it stopped
+        if first_error:
+            raise first_error[0]
+        if staging:
+            selects = " UNION ALL ".join(
+                f"SELECT * FROM {qualify(name)}" for name in worker_table_names
+            )
+            with cursor() as cur:
+                cur.execute(f"INSERT INTO {qualify(table_name)} {selects}")
+    finally:
+        if staging:
+            with cursor() as cur:
+                for name in worker_table_names:
+                    cur.execute(f"DROP TABLE IF EXISTS {qualify(name)}")
+    return tuple(future.result() for future in futures)